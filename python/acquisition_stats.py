@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import bisect
+
+##################################################
+# Constants
+##################################################
+MESSAGES_IN_KEY = 'stats_messages_in'
+SAMPLES_IN_KEY = 'stats_samples_in'
+BINS_IN_KEY = 'stats_bins_in'
+OVERRUNS_KEY = 'stats_overruns'
+QUEUE_HIGH_WATER_KEY = 'stats_queue_high_water'
+HANDLE_LATENCY_KEY = 'stats_handle_latency'
+DRAW_LATENCY_KEY = 'stats_draw_latency'
+SHOW_STATS_KEY = 'show_stats'
+
+##################################################
+# Latency histogram
+##################################################
+class latency_histogram(object):
+    """
+    Histogram of durations with four logarithmic buckets per decade,
+    from 10 us to 10 s. Adding a value is a bisection and an increment.
+    """
+
+    EDGES = [10**(e/4.0) for e in range(-20, 5)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.EDGES) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def mean(self):
+        if not self.count: return 0.0
+        return self.total / self.count
+
+    def percentile(self, p):
+        """
+        Get the upper edge of the bucket holding the p-th percentile.
+
+        Args:
+            p: the percentile in [0, 100]
+        """
+        if not self.count: return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.EDGES[i] if i < len(self.EDGES) else self.max
+        return self.max
+
+    def __str__(self):
+        return "mean %.1f ms, p95 %.1f ms, max %.1f ms" % (
+            1e3*self.mean(), 1e3*self.percentile(95), 1e3*self.max)
+
+##################################################
+# Acquisition statistics
+##################################################
+class acquisition_stats(object):
+    """
+    Counters for the path from the angle binner to the window.
+
+    The window reports every batch it handles and every frame it draws.
+    publish() copies the counters to the controller keys, together with
+    the samples the binner consumed and the overruns and high-water mark
+    of the ring in between. The ring never drops bins, an overrun is a
+    time the flow graph had to wait for the GUI.
+    """
+
+    def __init__(self, controller, ring, binner):
+        """
+        Create new acquisition statistics.
+
+        Args:
+            controller: the pubsub to publish to
+            ring: the spsc_ring between binner and window
+            binner: the angle_binner feeding the ring
+        """
+        self._controller = controller
+        self._ring = ring
+        self._binner = binner
+        self.messages_in = 0
+        self.bins_in = 0
+        self.handle_latency = latency_histogram()
+        self.draw_latency = latency_histogram()
+        self.publish()
+
+    def handled(self, nbins, seconds):
+        """
+        Count a batch of bins handled by the window.
+        """
+        self.messages_in += 1
+        self.bins_in += nbins
+        self.handle_latency.add(seconds)
+
+    def drawn(self, seconds):
+        """
+        Count a frame drawn by the window.
+        """
+        self.draw_latency.add(seconds)
+
+    def publish(self):
+        c = self._controller
+        c[MESSAGES_IN_KEY] = self.messages_in
+        c[SAMPLES_IN_KEY] = self._binner.samples_in
+        c[BINS_IN_KEY] = self.bins_in
+        c[OVERRUNS_KEY] = self._ring.overruns
+        c[QUEUE_HIGH_WATER_KEY] = self._ring.high_water
+        c[HANDLE_LATENCY_KEY] = self.handle_latency
+        c[DRAW_LATENCY_KEY] = self.draw_latency
+
+    def summary(self):
+        """
+        Get the counters as a few lines of text for an overlay.
+        """
+        return "\n".join((
+            "in: %d msgs, %d bins, %d samples" % (
+                self.messages_in, self.bins_in, self._binner.samples_in),
+            "ring: %d overruns, high water %d/%d" % (
+                self._ring.overruns, self._ring.high_water,
+                self._ring.capacity),
+            "handle: %s" % self.handle_latency,
+            "draw: %s" % self.draw_latency,
+        ))
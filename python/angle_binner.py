@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+from gnuradio import gr
+
+from ring_buffer import spsc_ring
+
+##################################################
+# Constants
+##################################################
+PASS_KEY = 'start_pass' # (direction, revolution time) of start_pass()
+PASS_DIRECTIONS = ('forward', 'reverse')
+AVERAGE_MODES = ('mean', 'rms', 'power_db')
+BIN_DTYPE = numpy.dtype([('bin', numpy.int64), ('value', numpy.float32)])
+DEFAULT_RING_REVOLUTIONS = 16 # revolutions the GUI may fall behind
+SPACE_TIMEOUT = 0.05 # seconds
+
+def make_ring(nbins, revolutions=DEFAULT_RING_REVOLUTIONS):
+    """
+    Create an spsc_ring for the completed bins of an angle_binner.
+    """
+    return spsc_ring(nbins*revolutions, BIN_DTYPE)
+
+##################################################
+# Angular binning sink
+##################################################
+class angle_binner(gr.sync_block):
+    """
+    Average the full rate input stream per angle bin.
+
+    The angle of a sample is its distance from the last reset in
+    revolutions, sample_rate * revolution_time samples make one turn.
+    Every sample that falls into a bin is averaged, either as plain mean,
+    as root mean square of a linear amplitude, or as the mean power of
+    samples in dB (10*log10 of the power), the result again in dB. Only
+    completed bins are written to the ring, as BIN_DTYPE records of the
+    absolute bin number since the reset (sweep * nbins + bin) and the
+    value. Bins that got no sample at all are NaN.
+
+    Nothing is dropped: when the ring is full, work() consumes only the
+    input whose bins still fit and so holds back the flow graph.
+
+    A motor that turns a single revolution per command is followed with
+    start_pass(): each pass restarts at angle zero as the next sweep,
+    and input after its revolution is ignored. A pass with a revolution
+    time starts a new measurement at sweep zero. The bins of a reverse
+    pass are mirrored, so both directions fill the same angles.
+    """
+
+    def __init__(self, ring, nbins, sample_rate, revolution_time=None,
+                 average='mean'):
+        """
+        Create a new angle binner.
+
+        Args:
+            ring: the spsc_ring of BIN_DTYPE to write completed bins to
+            nbins: the number of angle bins per revolution
+            sample_rate: the input sample rate
+            revolution_time: seconds per revolution, None to drop input
+            average: one of AVERAGE_MODES, 'rms' needs linear amplitude
+                     input, 'power_db' input in dB
+        """
+        gr.sync_block.__init__(self,
+            name="angle_binner",
+            in_sig=[numpy.float32],
+            out_sig=None)
+        if average not in AVERAGE_MODES:
+            raise ValueError("average must be one of %s" % (AVERAGE_MODES,))
+        self._ring = ring
+        self._nbins = int(nbins)
+        self._rms = average == 'rms'
+        self._power_db = average == 'power_db'
+        self._sample_rate = float(sample_rate)
+        self._revolution_time = revolution_time
+        self.samples_in = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Restart at angle zero and sweep zero with the next sample.
+        The reset is carried out by the scheduler thread in work().
+        """
+        self._pending_pass = None
+        self._pending_reset = True
+
+    def start_pass(self, direction='forward', revolution_time=None):
+        """
+        Start one revolution of the motor at angle zero with the next
+        sample. The pass gets the next sweep number, in a reverse pass
+        bin k of the turn is written as bin nbins-1-k.
+
+        Restart and pass are one request, no sample is binned between
+        them, so a measurement never follows a free running sweep.
+
+        Args:
+            direction: one of PASS_DIRECTIONS
+            revolution_time: seconds per revolution to restart at sweep
+                             zero with, None to follow the last pass
+        """
+        if direction not in PASS_DIRECTIONS:
+            raise ValueError("direction must be one of %s" %
+                (PASS_DIRECTIONS,))
+        self._pending_pass = (direction, revolution_time)
+
+    def set_sample_rate(self, sample_rate):
+        self._sample_rate = float(sample_rate)
+        self.reset()
+
+    def sample_rate(self):
+        return self._sample_rate
+
+    def set_revolution_time(self, revolution_time):
+        self._revolution_time = revolution_time
+        self.reset()
+
+    def _restart(self):
+        self._pending_reset = False
+        self._next_sweep = 0
+        self._begin(0, None, False)
+
+    def _start_pass(self):
+        (direction, revolution_time), self._pending_pass = \
+            self._pending_pass, None
+        reverse = direction == 'reverse'
+        sweep = self._next_sweep
+        if revolution_time is not None:
+            self._revolution_time = revolution_time
+            sweep = 0
+        elif self._end is None:
+            # after a free running start, the pass follows the open sweep
+            sweep = self._open_bin // self._nbins + (self._position > 0)
+        self._next_sweep = sweep + 1
+        self._begin(sweep, (sweep + 1) * self._nbins, reverse)
+
+    def _begin(self, sweep, end, reverse):
+        self._position = 0 # samples since the start
+        self._base = sweep * self._nbins
+        self._open_bin = self._base # absolute number of the bin being filled
+        self._open_sum = 0.0
+        self._open_count = 0
+        self._end = end # first bin after the pass, None to run on
+        self._reverse = reverse
+        if self._revolution_time:
+            self._bins_per_sample = self._nbins / \
+                    (self._sample_rate * float(self._revolution_time))
+        else:
+            self._bins_per_sample = None
+
+    def work(self, input_items, output_items):
+        if self._pending_reset: self._restart()
+        if self._pending_pass is not None: self._start_pass()
+        samples = input_items[0]
+        n = len(samples)
+        if self._bins_per_sample is None: return n
+
+        positions = self._position + numpy.arange(n)
+        bins = self._base + \
+            (positions * self._bins_per_sample).astype(numpy.int64)
+        if self._end is not None:
+            # input after the pass collects in a bin that is never written
+            bins = numpy.minimum(bins, self._end)
+        # k[i] is the number of bins sample i would complete
+        k = bins - self._open_bin
+        if k[-1] > self._ring.free():
+            # the GUI is behind, wait for room instead of dropping bins
+            self._ring.wait_space(SPACE_TIMEOUT)
+            n = int(numpy.searchsorted(k, self._ring.free(), side='right'))
+            if not n: return 0
+            k = k[:n]
+            samples = samples[:n]
+        self._position += n
+        self.samples_in += n
+        values = samples.astype(numpy.float64)
+        if self._rms: values *= values
+        # average dB samples as power, not their logarithms
+        if self._power_db: values = numpy.power(10, values / 10.0)
+
+        # histogram from the open bin up to the bin of the last sample
+        span = int(k[-1]) + 1
+        sums = numpy.bincount(k, values, span)
+        counts = numpy.bincount(k, minlength=span)
+        sums[0] += self._open_sum
+        counts[0] += self._open_count
+
+        # the last bin may still get samples from the next call
+        first = self._open_bin
+        self._open_bin += span - 1
+        self._open_sum = sums[-1]
+        self._open_count = counts[-1]
+        if span > 1:
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                done = sums[:-1] / counts[:-1]
+            if self._rms: done = numpy.sqrt(done)
+            if self._power_db:
+                with numpy.errstate(divide='ignore'):
+                    done = 10*numpy.log10(done)
+            records = numpy.empty(span - 1, BIN_DTYPE)
+            records['bin'] = numpy.arange(first, first + span - 1)
+            if self._reverse:
+                records['bin'] += self._nbins - 1 - \
+                    2*(records['bin'] % self._nbins)
+            records['value'] = done
+            self._ring.write(records)
+        return n
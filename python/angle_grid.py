@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+
+##################################################
+# Angle grid
+##################################################
+class angle_grid(object):
+    """
+    The centre angles of the bins of one revolution, in radians, with
+    their cosine and sine for renderers working in cartesian coordinates.
+    The arrays are read-only and shared, use get_angle_grid() to get one.
+
+    The tables ending in 2 span two revolutions, so any run of bins is a
+    contiguous slice. A renderer given positions in them looks up the
+    cosine and sine instead of computing them.
+    """
+
+    def __init__(self, nbins):
+        self.nbins = int(nbins)
+        self.angles = (numpy.arange(self.nbins) + 0.5) * (2*numpy.pi/self.nbins)
+        self.cos = numpy.cos(self.angles)
+        self.sin = numpy.sin(self.angles)
+        self.angles2 = numpy.concatenate((self.angles, self.angles))
+        self.cos2 = numpy.concatenate((self.cos, self.cos))
+        self.sin2 = numpy.concatenate((self.sin, self.sin))
+        self.bins = numpy.arange(self.nbins)
+        for a in (self.angles, self.cos, self.sin, self.angles2,
+                  self.cos2, self.sin2, self.bins):
+            a.flags.writeable = False
+
+    def run(self, first, count):
+        """
+        Get the angles of count consecutive bins, wrapping around.
+
+        Args:
+            first: the absolute number of the first bin
+            count: the number of bins, at most nbins
+
+        Returns:
+            a read-only view, no copy
+        """
+        start = first % self.nbins
+        return self.angles2[start:start+count]
+
+    def positions(self, first, count):
+        """
+        Get the positions of count consecutive bins in the tables
+        ending in 2, wrapping around.
+
+        Args:
+            first: the absolute number of the first bin
+            count: the number of bins, at most nbins
+        """
+        start = first % self.nbins
+        return numpy.arange(start, start + count)
+
+_grids = {}
+
+def get_angle_grid(nbins):
+    """
+    Get the angle grid for a number of bins, built on first use.
+
+    Args:
+        nbins: the number of bins per revolution
+    """
+    grid = _grids.get(nbins)
+    if grid is None:
+        grid = _grids[nbins] = angle_grid(nbins)
+    return grid
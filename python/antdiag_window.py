@@ -30,6 +30,19 @@ from gnuradio.wxgui.constants import *
 from gnuradio import gr #for gr.prefs
 from gnuradio.wxgui import forms
 
+import pattern_store
+from angle_binner import PASS_KEY
+from acquisition_stats import SHOW_STATS_KEY
+import pattern_report
+from display_scale import display_transform, to_linear, transform, \
+    DISPLAY_SCALE_KEY, DISPLAY_SCALES, DISPLAY_SCALE_LABELS
+from autoscale import autoscale
+from frame_scheduler import frame_scheduler, value_coalescer, \
+    DEFAULT_DRAW_BUDGET
+from polar_renderer import blit_renderer, overlay_layer, sector_trace, \
+    style_polar_axes, TRACE_COLOR
+from wx_polar_renderer import wx_polar_canvas, DEFAULT_RENDER_BACKEND
+
 
 import matplotlib
 matplotlib.use('WXAgg')
@@ -37,15 +50,15 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_wxagg import \
     FigureCanvasWxAgg as FigCanvas, \
     NavigationToolbar2WxAgg as NavigationToolbar
-import pylab
 
+import functools
 import time
 
 
-import serial
-from pexpect import fdpexpect
+import motor_connection
+from motor_driver import motor_driver
 
-from threading import Thread
+from threading import Lock
 from time import sleep
 
 
@@ -63,6 +76,14 @@ VALUE_REAL_KEY = 'value_real'
 SERIAL_PORT_KEY = 'ser_port'
 ROTATION_SPEED_KEY='rotationspeed'
 WORKING_KEY='working'
+OVERLAY_ADD_KEY = 'overlay_add'
+OVERLAY_REMOVE_KEY = 'overlay_remove'
+KEEP_SWEEPS_KEY = 'keep_sweeps'
+REFERENCE_NAME = 'reference'
+MOVE_TIMEOUT_MARGIN = 5 # seconds a revolution may take longer than planned
+SWEEP_MODE_KEY = 'sweep_mode'
+SWEEP_MODES = ('forward', 'bidirectional', 'average')
+SWEEP_MODE_LABELS = ('Forward only', 'Both directions', 'Average both')
 #VALUE_IMAG_KEY = 'value_imag'
 
 
@@ -99,69 +120,89 @@ class control_panel(wx.Panel):
             sizer=options_box, parent=self, label='Keep values',
             ps=parent, key=PEAK_HOLD_KEY,
         )
-
-        def openserial():
-            serport = serial.Serial('/dev/ttyACM0', 115200)
-            return serport
-
-        # def move_return():
-        #     with openserial() as serport:
-        #         ser = fdpexpect.fdspawn(serport)
-        #         #ser.sendline('set speed 960')
-        #         #ser.expect('OK')
-        #         ser.sendline('mb 3200')
-        #         ser.expect('OK')
-        #         ser.sendline('wait')
-        #         ser.expect('Waiting')
-        #         print("Moving back to start position")
-        #         ser.expect('OK, done')
-        #         time.sleep(1)
-        #
-
+        if parent.stats is not None:
+            forms.check_box(
+                sizer=options_box, parent=self, label='Statistics',
+                ps=parent, key=SHOW_STATS_KEY,
+            )
+        forms.drop_down(
+            sizer=options_box, parent=self, label='Scale',
+            ps=parent, key=DISPLAY_SCALE_KEY,
+            choices=DISPLAY_SCALES, labels=DISPLAY_SCALE_LABELS,
+        )
+        forms.drop_down(
+            sizer=options_box, parent=self, label='Sweep',
+            ps=parent, key=SWEEP_MODE_KEY,
+            choices=SWEEP_MODES, labels=SWEEP_MODE_LABELS,
+        )
+        forms.text_box(
+            sizer=options_box, parent=self, label='Previous sweeps',
+            converter=forms.int_converter(),
+            ps=parent, key=KEEP_SWEEPS_KEY,
+        )
+        forms.single_button(
+            sizer=options_box, parent=self,
+            label='Store reference',
+            callback=lambda v: parent.store_reference(),
+        )
+        forms.single_button(
+            sizer=options_box, parent=self,
+            label='Save pattern',
+            callback=lambda v: parent.save_pattern(),
+        )
+        forms.single_button(
+            sizer=options_box, parent=self,
+            label='Clear reference',
+            callback=lambda v: parent.__setitem__(
+                OVERLAY_REMOVE_KEY, REFERENCE_NAME),
+        )
 
         def start_measure_quick(v):
             if parent[WORKING_KEY]: return
-            thread = Thread(target = measure_thread_quick, args = ())
-            thread.start()
-
-        def measure_thread_quick():
+            parent[WORKING_KEY] = True
             try:
-                parent[WORKING_KEY] = True
-                #move_return()
-                with openserial() as serport:
-                    ser = fdpexpect.fdspawn(serport)
-                    print ("Starting measurement")
-
-                    #ser.sendline('set speed %s' % parent[ROTATION_SPEED_KEY])
-                    parent.calculate_rates()
-
-                    ser.sendline('C')
-                    ser.expect('OK')
-                    print("Running measurement...")
-                    ser.expect('FINISH')
-                    print("Finished.")
-                    ser.sendline('B')
-                    ser.expect('OK')
-                    print("go back...")
-                    ser.expect('FINISH')
-            finally:
+                print ("Starting measurement")
+                #parent.motor.submit('set speed %s' % parent[ROTATION_SPEED_KEY])
+                # raises on a speed that is no number or zero
+                parent.calculate_rates()
+                parent.start_measurement()
+                parent.motor.submit('C', ('OK', 'FINISH'), move_timeout(),
+                    callback=forward_done)
+            except Exception:
+                # nothing was started, the buttons must work again
                 parent[WORKING_KEY] = False
+                raise
+
+        def move_timeout():
+            return parent.revolution_time + parent.move_margin
+
+        # the callbacks run on the driver thread
+        def forward_done(command):
+            if command.state != 'done': return measure_done(command)
+            print("Finished.")
+            print("go back...")
+            if parent[SWEEP_MODE_KEY] != 'forward':
+                # record the way back too, into the mirrored bins
+                parent[PASS_KEY] = ('reverse', None)
+            parent.motor.submit('B', ('OK', 'FINISH'), move_timeout(),
+                callback=measure_done)
+
+        def measure_done(command):
+            if command.state != 'done':
+                print("%s: %s %s" % (command.line, command.state,
+                    command.error or ''))
+            wx.CallAfter(parent.__setitem__, WORKING_KEY, False)
 
         def emerg_stop(v):
-            with openserial() as serport:
-                ser = fdpexpect.fdspawn(serport)
-                ser.sendline('kill')
-                parent[WORKING_KEY] = False
+            # goes out at once, even while a measurement waits for FINISH
+            try: parent.motor.kill()
+            finally: parent[WORKING_KEY] = False
 
         def adj_cw(v):
-            with openserial() as serport:
-                ser = fdpexpect.fdspawn(serport)
-                ser.sendline('mf 16')
+            parent.motor.submit('mf 16')
 
         def adj_ccw(v):
-            with openserial() as serport:
-                ser = fdpexpect.fdspawn(serport)
-                ser.sendline('mb 16')
+            parent.motor.submit('mb 16')
 
         #run/stop
         control_box.AddStretchSpacer()
@@ -211,14 +252,16 @@ class antdiag_window(wx.Panel, pubsub.pubsub):
         degrees_per_step = 1.8
         self.revolution_time = 360.0 / (float(speed) * stepping * degrees_per_step)
 
-        self.samples_per_revolution = self.graphing_rate*self.revolution_time
-        if self.samples_per_revolution != int(self.samples_per_revolution):
-            print("WARNING: samples_per_revolution (graphing_rate * revolution_time) should be integer")
-        self.samples_per_revolution = int(self.samples_per_revolution)
-        self.angle_per_sample = 2*numpy.pi/self.samples_per_revolution
-
-        self.data = [0] * self.samples_per_revolution
-        self.data_ptr = 0
+    def start_measurement(self):
+        """
+        Start over with an empty pattern and restart the angle binner
+        for the forward pass. The last measurement becomes a previous
+        sweep.
+        """
+        with self.lock:
+            self.sweeps.restart()
+        # one request, the binner never runs between restart and pass
+        self[PASS_KEY] = ('forward', self.revolution_time)
 
     def __init__(
         self,
@@ -229,19 +272,43 @@ class antdiag_window(wx.Panel, pubsub.pubsub):
         maxval,
         peak_hold,
         msg_key,
-        graphing_rate,
-        rotation_speed
+        rotation_speed,
+        bin_width=pattern_store.DEFAULT_BIN_WIDTH,
+        stats=None,
+        keep_sweeps=0,
+        input_scale='db',
+        display_scale='db',
+        draw_budget=DEFAULT_DRAW_BUDGET,
+        render_backend=DEFAULT_RENDER_BACKEND,
+        serial_port=motor_connection.DEFAULT_SERIAL_PORT,
+        baudrate=motor_connection.DEFAULT_BAUDRATE,
+        move_margin=MOVE_TIMEOUT_MARGIN,
+        sweep_mode='forward'
     ):
         pubsub.pubsub.__init__(self)
         wx.Panel.__init__(self, parent, style=wx.SUNKEN_BORDER)
         #setup
-        self.graphing_rate = graphing_rate
         self[ROTATION_SPEED_KEY] = rotation_speed
-        self.calculate_rates()
-
-        self.draw_fps=1 # frames per second
-        self.draw_spf=1/self.draw_fps
-        self.draw_next=time.time()+self.draw_spf
+        self.pattern = pattern_store.pattern_accumulator(bin_width)
+        self.sweeps = pattern_store.sweep_tracker(self.pattern,
+            lambda mean: self.overlays.add_sweep(self.pattern.grid.angles,
+                mean))
+        # the pattern keeps linear power, the display transforms it
+        self.input_scale = input_scale
+        self.bounds = (minval, maxval)
+        self.display = display_transform(self.pattern.nbins, display_scale)
+        self.power = numpy.empty(self.pattern.nbins)
+        self.autoscale = autoscale()
+        self.lock = Lock()
+        self.stats = stats
+        # a driver of our own on the shared connection to the port
+        self.baudrate = baudrate
+        self.move_margin = move_margin
+        self.motor = motor_driver(motor_connection.acquire(serial_port,
+            baudrate))
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+
+        self.draw_fps=1 # initial frames per second, adapted to the draw time
 
 
         self.peak_val_real = NEG_INF
@@ -251,15 +318,21 @@ class antdiag_window(wx.Panel, pubsub.pubsub):
         #self.decimal_places = decimal_places
         #proxy the keys
         self.proxy(MSG_KEY, controller, msg_key)
+        self.proxy(SERIAL_PORT_KEY, controller, SERIAL_PORT_KEY)
+        self.proxy(PASS_KEY, controller, PASS_KEY)
+        self.calculate_rates()
         #self.proxy(AVERAGE_KEY, controller, average_key)
         #self.proxy(AVG_ALPHA_KEY, controller, avg_alpha_key)
         #self.proxy(SAMPLE_RATE_KEY, controller, sample_rate_key)
         #initialize values
         self[PEAK_HOLD_KEY] = peak_hold
         self[RUNNING_KEY] = True
-        self.draw_pending = True
         self[VALUE_REAL_KEY] = minval
         self[WORKING_KEY] = False
+        self[SHOW_STATS_KEY] = False
+        self[KEEP_SWEEPS_KEY] = keep_sweeps
+        self[DISPLAY_SCALE_KEY] = display_scale
+        self[SWEEP_MODE_KEY] = sweep_mode
         #setup the box with display and controls
         self.control_panel = control_panel(self)
         main_box = wx.BoxSizer(wx.HORIZONTAL)
@@ -280,15 +353,63 @@ class antdiag_window(wx.Panel, pubsub.pubsub):
             minimum=minval, maximum=maxval, num_steps=DEFAULT_GAUGE_RANGE,
         )
 
-        self.init_plot(minval, maxval)
-        self.canvas = FigCanvas(self, -1, self.fig)
+        if render_backend == 'wx':
+            self.init_wx_plot(minval, maxval)
+        else:
+            self.init_plot(minval, maxval)
+            self.canvas = FigCanvas(self, -1, self.fig)
+            self.renderer = blit_renderer(self.canvas, self.axes,
+                self.trace.lines + [self.stats_text])
         sizer.Add(self.canvas, 1, flag=wx.LEFT | wx.RIGHT | wx.GROW)
+        self.overlays = overlay_layer(self.renderer, keep_sweeps,
+            functools.partial(transform, scale=display_scale))
 
         #hide/show gauges
         self.show_gauges(True)
         self.SetSizerAndFit(main_box)
         #register events
+        self.frames = frame_scheduler(self, self.draw_plot, self.draw_fps,
+            ps=controller, budget=draw_budget)
+        self.values = value_coalescer(self, self.show_value)
         self.subscribe(MSG_KEY, self.handle_msg)
+        self.subscribe(SHOW_STATS_KEY, self.frames.invalidate)
+        self.subscribe(OVERLAY_ADD_KEY, self.handle_overlay_add)
+        self.subscribe(OVERLAY_REMOVE_KEY, self.overlays.remove)
+        self.subscribe(KEEP_SWEEPS_KEY, self.overlays.set_keep)
+        self.subscribe(DISPLAY_SCALE_KEY, self.set_display_scale)
+        self.subscribe(SERIAL_PORT_KEY, self.set_serial_port)
+        for key in (OVERLAY_ADD_KEY, OVERLAY_REMOVE_KEY, KEEP_SWEEPS_KEY,
+                    DISPLAY_SCALE_KEY):
+            self.subscribe(key, self.frames.invalidate)
+
+    def on_destroy(self, event):
+        event.Skip()
+        # the destroy events of child windows propagate here too
+        if event.GetEventObject() is not self: return
+        # the timers must not fire into a destroyed window
+        self.frames.stop()
+        self.values.stop()
+        self._close_motor()
+
+    def set_serial_port(self, port):
+        """
+        Move the motor driver to another port. A measurement running on
+        the old port is stopped, STOP only reaches the new one.
+        """
+        if port == self.motor.connection.port: return
+        self._close_motor()
+        self[WORKING_KEY] = False
+        self.motor = motor_driver(motor_connection.acquire(port,
+            self.baudrate))
+
+    def _close_motor(self):
+        # the driver thread must be done with the port before release
+        try:
+            if self[WORKING_KEY]: self.motor.kill()
+        finally:
+            self.motor.stop()
+            self.motor.join()
+            motor_connection.release(self.motor.connection)
 
     def show_gauges(self, show_gauge):
         """
@@ -300,39 +421,94 @@ class antdiag_window(wx.Panel, pubsub.pubsub):
         """
         self.gauge_real.ShowItems(show_gauge)
 
+    def set_display_scale(self, scale):
+        """
+        Show the pattern and the overlays in another scale.
+
+        Args:
+            scale: one of display_scale.DISPLAY_SCALES
+        """
+        with self.lock:
+            self.display.set_scale(scale)
+        self.overlays.set_transform(functools.partial(transform, scale=scale))
+
+    def handle_overlay_add(self, overlay):
+        """
+        Add an overlay trace from the OVERLAY_ADD_KEY.
+
+        Args:
+            overlay: a tuple of name and the linear power of every bin
+        """
+        name, values = overlay
+        self.overlays.add(name, self.pattern.grid.angles, values)
+
+    def store_reference(self):
+        """
+        Keep the current pattern as reference overlay.
+        """
+        with self.lock:
+            mean = self.pattern.mean()
+        self[OVERLAY_ADD_KEY] = (REFERENCE_NAME, mean)
+
+    def save_pattern(self):
+        """
+        Store the current pattern for pattern_report, named by the time,
+        in the scale on the screen.
+        """
+        with self.lock:
+            mean = self.pattern.mean()
+        scale = self.display.scale
+        filename = time.strftime("pattern_%Y%m%d_%H%M%S.npz")
+        pattern_report.save_pattern(filename, self.pattern.grid.angles,
+            transform(mean, scale), scale=scale)
+        print "saved %s" % filename
+
+    def show_value(self, sample):
+        """
+        Set the gauge and the label, called by the value coalescer.
+        """
+        format_string = "%.10f"
+        label_text = "%s %s"%(format_string%sample,"")
+        self[VALUE_REAL_KEY] = sample
+
+        #set label text
+        self[VALUE_REPR_KEY] = label_text
+
     def handle_msg(self, msg):
         try:
             """
-            Handle a message from the message queue.
-            Convert the string based message into a float or complex.
-            If more than one number was read, only take the last number.
-            Perform peak hold operations, set the gauges and display.
+            Handle a batch of bins from the ring watcher.
+            Take the completed angle bins drained from the ring, records
+            of the absolute bin number and its value. All bins of the
+            message are written to the pattern in one step, the gauge and
+            label show the latest value at a capped rate.
+            Perform peak hold operations, the frame scheduler redraws
+            the display.
 
             Args:
-                event: event.data is the number sample as a character array
+                msg: array of angle_binner.BIN_DTYPE records
             """
             #print time.time()
-            format_string = "%.10f"
-
-            sample = numpy.fromstring(msg, numpy.float32)[-1]
-            label_text = "%s %s"%(format_string%sample,"")
-            self[VALUE_REAL_KEY] = sample
+            start = time.time()
 
-            #set label text
-            self[VALUE_REPR_KEY] = label_text
+            samples = msg['value']
+            if not len(samples): return
+            self.values.add(samples)
 
 
             if self[RUNNING_KEY]:
-                self.data[self.data_ptr] = sample
-                self.data_ptr += 1
-                if self.data_ptr >= self.samples_per_revolution:
-                    self.data_ptr = 0
-
-            if (self[RUNNING_KEY] or self.draw_pending) \
-                     and (self.draw_next <= time.time()):
-                self.draw_plot()
-                self.draw_next=time.time()+self.draw_spf
-                self.draw_pending = self[RUNNING_KEY]
+                samples = to_linear(samples, self.input_scale)
+                # both passes of a round trip make one sweep
+                passes = 2 if self[SWEEP_MODE_KEY] == 'average' else 1
+                with self.lock:
+                    # completed revolutions become overlays, a new one
+                    # replaces the pattern unless values are kept
+                    self.sweeps.add(msg['bin'], samples,
+                        self[PEAK_HOLD_KEY], passes)
+                self.frames.invalidate()
+
+            if self.stats is not None:
+                self.stats.handled(len(samples), time.time() - start)
 
         except Exception,e:
             print e
@@ -346,43 +522,81 @@ class antdiag_window(wx.Panel, pubsub.pubsub):
         self.fig = Figure((3.0, 3.0), dpi=self.dpi)
 
         self.axes = self.fig.add_subplot(111, projection='polar')
-        self.axes.set_axis_bgcolor('#444444')
-        self.axes.set_title('Radiation pattern', size=10)
-
-        print "init_plot 2"
-
-        xmin=0
-        xmax=2*numpy.pi
-        self.axes.set_xbound(lower=xmin, upper=xmax)
-        self.axes.grid(True, color='gray')
+        style_polar_axes(self.axes, 'Radiation pattern')
 
-        print "init_plot 3"
-
-        pylab.setp(self.axes.get_xticklabels(), fontsize=8)
-        pylab.setp(self.axes.get_yticklabels(), fontsize=8)
-        pylab.setp(self.axes.get_xticklabels(), visible=True)
-
-        # plot the data as a line series, and save the reference
-        # to the plotted line series
+        # plot the data as one line series per sector, so a frame
+        # only redraws the sectors that changed
         #
-        self.plot_data = self.axes.plot(
-            self.data,
+        self.trace = sector_trace(lambda: self.axes.plot(
+            [], [],
             linewidth=1,
-            color=(1, 1, 0),
-            )[0]
+            color=TRACE_COLOR,
+            )[0], self.pattern.grid)
 
         self.axes.set_ybound(lower=minval, upper=maxval)
+
+        # acquisition statistics overlay
+        self.stats_text = self.fig.text(
+            0.01, 0.01, '',
+            fontsize=6, family='monospace', color='gray',
+            verticalalignment='bottom', visible=False,
+            )
         print "setting xmin=%f, xmax=%f"%(minval,maxval)
         print "init_plot DONE"
 
 
+    def init_wx_plot(self, minval, maxval):
+        """
+        Set up the wx_polar_canvas with the same traces as init_plot.
+        """
+        self.canvas = wx_polar_canvas(self, size=(300, 300),
+            title='Radiation pattern')
+        self.trace = sector_trace(lambda: self.canvas.plot(
+            linewidth=1, color=TRACE_COLOR), self.pattern.grid)
+        self.stats_text = self.canvas.text(color='gray', fontsize=6,
+            visible=False)
+        self.canvas.set_ybound(minval, maxval)
+        # the canvas renders its frames itself
+        self.renderer = self.canvas
+
     def draw_plot(self):
-        myxrange=numpy.arange(
-                0,
-                self.angle_per_sample*len(self.data),
-                self.angle_per_sample)
-        #print len(myxrange),len(self.data)
-        self.plot_data.set_xdata(myxrange)
-        self.plot_data.set_ydata(numpy.array(self.data))
-
-        self.canvas.draw()
+        start = time.time()
+        # one point per angle bin, empty bins leave a gap.
+        # only the bins that changed since the last frame are
+        # transformed and redrawn
+        with self.lock:
+            changed = self.pattern.take_dirty()
+            self.power[changed] = self.pattern.mean(changed)
+            self.display.mark(changed)
+            values = self.display.apply(self.power)
+            changed = self.display.changed
+            scale = self.display.scale
+        # the configured bounds are in input units, other scales
+        # follow the data
+        if scale == self.input_scale:
+            bounds = self.bounds
+        else:
+            self.autoscale.reset()
+            self.autoscale.add(values)
+            bounds = self.autoscale.limits(None)
+        if bounds is not None:
+            self.renderer.set_ybound(*bounds)
+        # overlays are drawn once into the background
+        self.overlays.apply()
+        # a full draw, after a change of the bounds or the overlays,
+        # needs every sector up to date
+        if self.renderer.needs_full(): changed = None
+        regions = self.trace.update(self.renderer, values, changed)
+
+        show_stats = self.stats is not None and self[SHOW_STATS_KEY]
+        if show_stats or self.stats_text.get_visible():
+            # the overlay text changes every frame, blit everything
+            regions = None
+        self.stats_text.set_visible(show_stats)
+        if show_stats:
+            self.stats_text.set_text(self.stats.summary())
+
+        self.renderer.draw(regions)
+        if self.stats is not None:
+            self.stats.drawn(time.time() - start)
+            self.stats.publish()
@@ -23,6 +23,13 @@ import numpy
 from gnuradio import gr
 
 import antdiag_window
+import pattern_store
+import frame_scheduler
+import motor_connection
+import wx_polar_renderer
+from angle_binner import angle_binner, make_ring, PASS_KEY
+from ring_buffer import ring_watcher
+from acquisition_stats import acquisition_stats
 from gnuradio.wxgui import common
 from gnuradio import gr, filter
 from gnuradio import analog
@@ -42,8 +49,18 @@ class antenna_diagram(gr.hier_block2, common.wxgui_hb):
         graphing_rate=1,
         size=antdiag_window.DEFAULT_WIN_SIZE,
         peak_hold=False,
-        serial_port='/dev/ttyUSB0',
+        serial_port=motor_connection.DEFAULT_SERIAL_PORT,
+        baudrate=motor_connection.DEFAULT_BAUDRATE,
         rotation_speed=60,
+        bin_width=pattern_store.DEFAULT_BIN_WIDTH,
+        keep_sweeps=0,
+        input_scale='db',
+        display_scale='db',
+        average='mean',
+        draw_budget=frame_scheduler.DEFAULT_DRAW_BUDGET,
+        render_backend=wx_polar_renderer.DEFAULT_RENDER_BACKEND,
+        move_margin=antdiag_window.MOVE_TIMEOUT_MARGIN,
+        sweep_mode='forward',
         **kwargs #catchall for backwards compatibility
         ):
             #init
@@ -55,23 +72,29 @@ class antenna_diagram(gr.hier_block2, common.wxgui_hb):
             gr.io_signature(0, 0, 0),
         )
         #blocks
-        sd = blocks.stream_to_vector_decimator(
-            item_size=gr.sizeof_float,
+        #graphing_rate is kept for compatibility, every sample is
+        #averaged into its angle bin and only completed bins are posted.
+        #the window restarts the binner with the revolution time of a
+        #measurement, it drops the input before
+        nbins = pattern_store.num_bins(bin_width)
+        ring = make_ring(nbins)
+        binner = angle_binner(
+            ring=ring,
+            nbins=nbins,
             sample_rate=sample_rate,
-            vec_rate=graphing_rate,
-            vec_len=1,
+            average=average,
         )
 
         #mult = blocks.multiply_const_ff(factor)
         #add = blocks.add_const_ff(ref_level)
         #avg = filter.single_pole_iir_filter_ff(1.0)
 
-        msgq = gr.msg_queue(2)
-        sink = blocks.message_sink(self._item_size, msgq, True)
         #controller
         self.controller = pubsub()
-        self.controller.subscribe(SAMPLE_RATE_KEY, sd.set_sample_rate)
-        self.controller.publish(SAMPLE_RATE_KEY, sd.sample_rate)
+        self.controller.subscribe(SAMPLE_RATE_KEY, binner.set_sample_rate)
+        self.controller.publish(SAMPLE_RATE_KEY, binner.sample_rate)
+        self.controller.subscribe(PASS_KEY,
+            lambda request: binner.start_pass(*request))
         self.controller[antdiag_window.SERIAL_PORT_KEY] = serial_port
         #self.controller[AVERAGE_KEY] = False
         #self.controller[AVG_ALPHA_KEY] = None
@@ -83,7 +106,8 @@ class antenna_diagram(gr.hier_block2, common.wxgui_hb):
         #self.controller.subscribe(AVG_ALPHA_KEY, update_avg)
 
         #start input watcher
-        common.input_watcher(msgq, self.controller, MSG_KEY)
+        ring_watcher(ring, self.controller, MSG_KEY)
+        self.stats = acquisition_stats(self.controller, ring, binner)
         #create window
         self.win = antdiag_window.antdiag_window(
             parent=parent,
@@ -93,8 +117,18 @@ class antenna_diagram(gr.hier_block2, common.wxgui_hb):
             maxval=maxval,
             peak_hold=peak_hold,
             msg_key=MSG_KEY,
-            graphing_rate=graphing_rate,
-            rotation_speed=rotation_speed
+            rotation_speed=rotation_speed,
+            bin_width=bin_width,
+            stats=self.stats,
+            keep_sweeps=keep_sweeps,
+            input_scale=input_scale,
+            display_scale=display_scale,
+            draw_budget=draw_budget,
+            render_backend=render_backend,
+            serial_port=serial_port,
+            baudrate=baudrate,
+            move_margin=move_margin,
+            sweep_mode=sweep_mode,
         )
         common.register_access_methods(self, self.controller)
         #backwards compadibility
@@ -102,7 +136,7 @@ class antenna_diagram(gr.hier_block2, common.wxgui_hb):
         #connect
 
         #self.wxgui_connect(self, sd, mult, add, avg, sink)
-        self.wxgui_connect(self, sd, sink)
+        self.wxgui_connect(self, binner)
 
 
 
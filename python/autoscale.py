@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+
+##################################################
+# Constants
+##################################################
+DEFAULT_MARGIN = 0.1 # of the data range, added on both sides
+DEFAULT_SHRINK = 0.5 # shrink when the data uses less of the range
+
+##################################################
+# Autoscale with hysteresis
+##################################################
+class autoscale(object):
+    """
+    Radial limits that follow the extrema of the displayed samples.
+
+    The extrema are updated incrementally as samples arrive. When a
+    sample that might have been an extremum leaves the display, they
+    are only marked stale and recomputed on the next limits() call.
+    The limits themselves only move when the data leaves them, or when
+    it shrinks to less than the shrink fraction of their range, so the
+    cached plot background stays valid most of the time.
+    """
+
+    def __init__(self, margin=DEFAULT_MARGIN, shrink=DEFAULT_SHRINK):
+        self.margin = margin
+        self.shrink = shrink
+        self.lower = None
+        self.upper = None
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the extrema, the limits are kept.
+        """
+        self._min = numpy.inf
+        self._max = -numpy.inf
+        self._stale = False
+
+    def add(self, values):
+        """
+        Take new samples into account.
+        """
+        if not len(values) or numpy.isnan(values).all(): return
+        self._min = min(self._min, numpy.nanmin(values))
+        self._max = max(self._max, numpy.nanmax(values))
+
+    def remove(self, values):
+        """
+        Take samples out of account, recompute the extrema if needed.
+        """
+        if not len(values) or numpy.isnan(values).all(): return
+        if numpy.nanmin(values) <= self._min or numpy.nanmax(values) >= self._max:
+            self.invalidate()
+
+    def invalidate(self):
+        """
+        Mark the extrema stale, e.g. when the displayed samples were
+        replaced, they are recomputed on the next limits() call.
+        """
+        self._stale = True
+
+    def limits(self, extrema):
+        """
+        Get the radial limits.
+
+        Args:
+            extrema: callable returning (min, max) of all displayed
+                samples, only called when the tracked extrema are stale
+
+        Returns:
+            (lower, upper), or None before the first sample
+        """
+        if self._stale:
+            self.reset()
+            self._min, self._max = extrema()
+        ymin, ymax = self._min, self._max
+        if not ymin <= ymax: return None
+        if self.lower is not None and self.lower <= ymin and ymax <= self.upper \
+                and ymax - ymin >= self.shrink * (self.upper - self.lower):
+            return self.lower, self.upper
+        # rounded outwards so the data stays inside, to whole units, or
+        # to the decade of the data when it spans less, like linear power
+        span = ymax - ymin or max(abs(ymin), abs(ymax))
+        step = 1.0
+        if 0 < span < 1: step = 10.0**numpy.floor(numpy.log10(span))
+        ymin = numpy.floor(ymin / step) * step
+        ymax = numpy.ceil(ymax / step) * step
+        if ymin == ymax: ymax += step
+        delta = (ymax-ymin)*self.margin
+        self.lower = ymin - delta
+        self.upper = ymax + delta
+        return self.lower, self.upper
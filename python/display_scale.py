@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+
+##################################################
+# Constants
+##################################################
+DISPLAY_SCALE_KEY = 'display_scale'
+DISPLAY_SCALES = ('linear', 'db', 'normalized')
+DISPLAY_SCALE_LABELS = ('Linear', 'dB', 'dB rel. peak')
+INPUT_SCALES = ('linear', 'db')
+
+def to_linear(values, input_scale):
+    """
+    Convert input samples to linear power.
+
+    Args:
+        values: array of samples
+        input_scale: 'linear', or 'db' for 10*log10 of the power
+    """
+    if input_scale not in INPUT_SCALES:
+        raise ValueError("input_scale must be one of %s" % (INPUT_SCALES,))
+    if input_scale == 'linear': return values
+    return numpy.power(10, values / 10.0)
+
+def to_db(power):
+    """
+    Convert linear power to dB, NaN where there is no power.
+    """
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return 10*numpy.log10(numpy.where(power > 0, power, numpy.nan))
+
+def transform(power, scale):
+    """
+    Transform linear power to a display scale in one go, for traces
+    that are transformed once, like overlays. Normalized is relative to
+    the peak of the trace itself.
+
+    Args:
+        power: array of linear power, NaN for empty bins
+        scale: one of DISPLAY_SCALES
+    """
+    if scale not in DISPLAY_SCALES:
+        raise ValueError("scale must be one of %s" % (DISPLAY_SCALES,))
+    if scale == 'linear': return power
+    db = to_db(power)
+    if scale == 'normalized' and not numpy.isnan(db).all():
+        db -= numpy.nanmax(db)
+    return db
+
+##################################################
+# Display transform
+##################################################
+class display_transform(object):
+    """
+    Linear power per bin to the values on the screen.
+
+    The pattern keeps linear power, so switching between linear, dB and
+    dB relative to the peak needs no new measurement. The dB values are
+    kept in a buffer and only recomputed for bins marked as changed, the
+    output buffer is reused from frame to frame. Normalizing is a
+    subtraction of the peak, redone for all bins only when the peak
+    moves. Bins without power are NaN, a gap in the plot.
+    """
+
+    def __init__(self, nbins, scale='db'):
+        """
+        Create a new display transform.
+
+        Args:
+            nbins: the number of bins
+            scale: one of DISPLAY_SCALES
+        """
+        self.nbins = nbins
+        self._db = numpy.empty(nbins)
+        self.out = numpy.empty(nbins)
+        self._dirty = numpy.ones(nbins, bool)
+        self._peak = numpy.nan
+        self.changed = numpy.zeros(0, numpy.int64)
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        if scale not in DISPLAY_SCALES:
+            raise ValueError("scale must be one of %s" % (DISPLAY_SCALES,))
+        self.scale = scale
+        self._rescale = True
+
+    def mark(self, bins):
+        """
+        Mark bins as changed since the last apply().
+        """
+        self._dirty[bins] = True
+
+    def mark_all(self):
+        self._dirty[:] = True
+
+    def apply(self, power):
+        """
+        Transform the changed bins.
+
+        Args:
+            power: linear power per bin, NaN for empty bins
+
+        Returns:
+            the output buffer, valid until the next call; the indices
+            of the bins it changed in are left in the changed attribute
+        """
+        if self._rescale:
+            self._dirty[:] = True
+        changed = numpy.flatnonzero(self._dirty)
+        self._dirty[:] = False
+        self.changed = changed
+        rescale, self._rescale = self._rescale, False
+        if self.scale == 'linear':
+            self.out[changed] = power[changed]
+            return self.out
+        db = to_db(power[changed])
+        self._db[changed] = db
+        if self.scale == 'db':
+            self.out[changed] = db
+            return self.out
+        if numpy.isnan(self._db).all(): peak = numpy.nan
+        else: peak = numpy.nanmax(self._db)
+        if rescale or not peak == self._peak:
+            # a new peak moves every bin
+            self._peak = peak
+            numpy.subtract(self._db, peak, out=self.out)
+            self.changed = numpy.arange(self.nbins)
+        else:
+            self.out[changed] = db - peak
+        return self.out
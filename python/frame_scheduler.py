@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import threading
+import time
+import numpy
+import wx
+
+##################################################
+# Constants
+##################################################
+DRAW_FPS_KEY = 'draw_fps'
+DRAW_DUTY_KEY = 'draw_duty'
+DRAW_BUDGET_KEY = 'draw_budget'
+DEFAULT_DRAW_BUDGET = 0.25 # fraction of GUI time spent drawing
+DEFAULT_MIN_FPS = 0.5
+DEFAULT_MAX_FPS = 30
+COST_ALPHA = 0.2 # smoothing of the measured draw time
+DEFAULT_VALUE_RATE = 10 # updates per second of gauges and labels
+VALUE_MODES = ('latest', 'mean')
+
+##################################################
+# Frame scheduler
+##################################################
+class frame_scheduler(object):
+    """
+    Redraw a window from a wx.Timer in the GUI thread.
+
+    The message handlers only ingest data and call invalidate(), which
+    is safe from any thread. On every timer tick the draw callback runs
+    if something changed since the last frame, so a slow redraw never
+    stalls the acquisition path.
+
+    The time of every frame is measured and the frame rate follows it:
+    the highest rate between min_fps and max_fps at which drawing takes
+    at most the budget fraction of the time. The chosen rate and the
+    resulting duty cycle are published on the pubsub, the budget can be
+    changed there.
+    """
+
+    def __init__(self, window, draw, fps, ps=None,
+                 budget=DEFAULT_DRAW_BUDGET,
+                 min_fps=DEFAULT_MIN_FPS, max_fps=DEFAULT_MAX_FPS):
+        """
+        Create a new frame scheduler.
+
+        Args:
+            window: the wx window owning the timer
+            draw: callable that renders one frame
+            fps: frames per second until the first frame was measured
+            ps: optional pubsub for the DRAW_* keys
+            budget: the fraction of time drawing may take
+            min_fps: the lowest frame rate
+            max_fps: the highest frame rate
+        """
+        self._draw = draw
+        self._dirty = True
+        self._cost = None
+        self._ps = ps
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self._timer = wx.Timer(window)
+        window.Bind(wx.EVT_TIMER, self._on_timer, self._timer)
+        self.set_budget(budget)
+        self.set_fps(fps)
+        if ps is not None:
+            ps[DRAW_BUDGET_KEY] = budget
+            ps.subscribe(DRAW_BUDGET_KEY, self.set_budget)
+
+    def set_budget(self, budget):
+        self.budget = min(max(float(budget), 0.01), 1.0)
+
+    def set_fps(self, fps):
+        self.fps = float(fps)
+        self._timer.Start(int(round(1000.0 / self.fps)))
+        if self._ps is not None: self._ps[DRAW_FPS_KEY] = self.fps
+    def invalidate(self, *args):
+        """
+        Request a redraw with the next tick.
+        """
+        self._dirty = True
+
+    def stop(self):
+        self._timer.Stop()
+
+    def _on_timer(self, event):
+        if not self._dirty: return
+        self._dirty = False
+        start = time.time()
+        try:
+            self._draw()
+        except Exception, e:
+            print e
+        self._adapt(time.time() - start)
+
+    def _adapt(self, cost):
+        if self._cost is None: self._cost = cost
+        self._cost += COST_ALPHA * (cost - self._cost)
+        fps = self.budget / max(self._cost, 1e-6)
+        fps = min(max(fps, self.min_fps), self.max_fps)
+        # restarting the timer for every little change is not worth it
+        if abs(fps - self.fps) > 0.1 * self.fps: self.set_fps(fps)
+        if self._ps is not None: self._ps[DRAW_DUTY_KEY] = self._cost * self.fps
+
+##################################################
+# Value coalescer
+##################################################
+class value_coalescer(object):
+    """
+    Update value widgets at a capped rate from a wx.Timer.
+
+    The message handlers add every batch of values, which is cheap and
+    safe from any thread. The timer publishes one value per tick, the
+    latest or the mean of the values added since the last tick, and only
+    if there were any. NaN and infinite values, like the mean of an
+    empty bin, are left out. Gauges and labels then cost a fixed number of
+    widget updates per second, whatever the message rate.
+    """
+
+    def __init__(self, window, publish, rate=DEFAULT_VALUE_RATE,
+                 mode='latest'):
+        """
+        Create a new value coalescer.
+
+        Args:
+            window: the wx window owning the timer
+            publish: callable taking the value, runs in the GUI thread
+            rate: the highest number of updates per second
+            mode: 'latest' or 'mean'
+        """
+        if mode not in VALUE_MODES:
+            raise ValueError("mode must be one of %s" % (VALUE_MODES,))
+        self._publish = publish
+        self._mean = mode == 'mean'
+        self._lock = threading.Lock()
+        self._count = 0
+        self._sum = 0.0
+        self._latest = None
+        self._timer = wx.Timer(window)
+        window.Bind(wx.EVT_TIMER, self._on_timer, self._timer)
+        self._timer.Start(int(round(1000.0 / rate)))
+
+    def add(self, values):
+        """
+        Add a batch of values, the last finite one is the latest.
+        """
+        # a gauge cannot show NaN, int() of it raises in the timer
+        values = values[numpy.isfinite(values)]
+        if not len(values): return
+        with self._lock:
+            self._count += len(values)
+            if self._mean: self._sum += float(values.sum())
+            self._latest = values[-1]
+
+    def stop(self):
+        self._timer.Stop()
+
+    def _on_timer(self, event):
+        with self._lock:
+            if not self._count: return
+            if self._mean: value = self._sum / self._count
+            else: value = self._latest
+            self._count = 0
+            self._sum = 0.0
+        self._publish(value)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import threading
+import time
+import serial
+
+##################################################
+# Constants
+##################################################
+DEFAULT_SERIAL_PORT = '/dev/ttyACM0'
+DEFAULT_BAUDRATE = 115200
+DEFAULT_TIMEOUT = 30 # seconds to wait for a response
+READ_POLL = 0.1 # seconds a read blocks before the deadline is checked
+
+_IO_ERRORS = (OSError, serial.SerialException)
+
+##################################################
+# Serial connection
+##################################################
+class serial_connection(object):
+    """
+    One long lived connection to the motor controller.
+
+    Opening the port resets the Nucleo board and takes hundreds of
+    milliseconds, so the port is opened once and kept open. Writes and
+    reads have separate locks: a thread waiting for a response never
+    delays a command, kill goes out at once. A command sequence holds
+    read_lock so no other thread takes its responses.
+
+    An I/O error closes the port and the next use opens it again, a
+    failed write is retried once on the new connection. After close()
+    the port stays closed and every use raises.
+    """
+
+    def __init__(self, port=DEFAULT_SERIAL_PORT, baudrate=DEFAULT_BAUDRATE):
+        """
+        Create a new connection, the port is opened on first use.
+
+        Args:
+            port: the serial device of the controller
+            baudrate: the baud rate of the port
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.read_lock = threading.RLock()
+        self.users = 0
+        self._serial = None
+        self._closed = False
+        self._partial = ''
+        self._open_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _open(self):
+        with self._open_lock:
+            if self._closed:
+                raise serial.SerialException("%s is closed" % self.port)
+            if self._serial is None:
+                self._serial = serial.Serial(self.port, self.baudrate,
+                    timeout=READ_POLL)
+                self._partial = ''
+            return self._serial
+
+    def _failed(self, port):
+        # another thread may have reconnected already
+        with self._open_lock:
+            if self._serial is not port: return
+            self._serial = None
+        try: port.close()
+        except _IO_ERRORS: pass
+
+    def connect(self):
+        """
+        Open the port in the background, so the first command does not
+        wait for the board to come up. Errors are left to that command.
+        """
+        def target():
+            try: self._open()
+            except _IO_ERRORS: pass
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        """
+        Close the port for good, a closed connection is never reopened.
+        """
+        with self._open_lock:
+            self._closed = True
+            port, self._serial = self._serial, None
+        if port is not None:
+            try: port.close()
+            except _IO_ERRORS: pass
+
+    def sendline(self, line):
+        """
+        Send a command line, without waiting for the response.
+        """
+        with self._write_lock:
+            for retry in (False, True):
+                port = self._open()
+                try:
+                    port.write((line + '\n').encode('ascii'))
+                    return
+                except _IO_ERRORS:
+                    self._failed(port)
+                    if retry: raise
+
+    def discard(self):
+        """
+        Drop the responses nobody waited for, like those of the adjust
+        buttons, before a command sequence starts.
+        """
+        with self.read_lock:
+            port = self._open()
+            try: port.reset_input_buffer()
+            except AttributeError: port.flushInput() # pyserial 2
+            except _IO_ERRORS:
+                self._failed(port)
+                raise
+            self._partial = ''
+
+    def readline(self, timeout=DEFAULT_TIMEOUT):
+        """
+        Read one response line.
+
+        Args:
+            timeout: seconds to wait, None to wait forever
+
+        Returns:
+            the line without its line end, None on timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.read_lock:
+            while True:
+                port = self._open()
+                try: data = port.readline().decode('ascii', 'replace')
+                except _IO_ERRORS:
+                    self._failed(port)
+                    raise
+                self._partial += data
+                if self._partial.endswith('\n'):
+                    line, self._partial = self._partial.strip(), ''
+                    return line
+                if deadline is not None and time.time() > deadline:
+                    return None
+
+    def expect(self, pattern, timeout=DEFAULT_TIMEOUT):
+        """
+        Read lines until one contains pattern.
+
+        Args:
+            pattern: the text to wait for
+            timeout: seconds to wait, None to wait forever
+
+        Returns:
+            the matching line
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.read_lock:
+            while True:
+                remaining = None if deadline is None else \
+                    max(deadline - time.time(), 0)
+                line = self.readline(remaining)
+                if line is None:
+                    raise serial.SerialTimeoutException(
+                        "no %r from %s" % (pattern, self.port))
+                if pattern in line: return line
+
+##################################################
+# Connection pool
+##################################################
+# one connection per port, shared by all windows of the process
+_connections = {}
+_connections_lock = threading.Lock()
+
+def acquire(port=DEFAULT_SERIAL_PORT, baudrate=DEFAULT_BAUDRATE):
+    """
+    Get the connection to a port, it is opened in the background.
+    Every acquire needs a release.
+    """
+    with _connections_lock:
+        connection = _connections.get(port)
+        if connection is None:
+            connection = _connections[port] = \
+                serial_connection(port, baudrate)
+            connection.connect()
+        elif connection.baudrate != baudrate:
+            raise ValueError("%s is open at %d baud" % (port,
+                connection.baudrate))
+        connection.users += 1
+        return connection
+
+def release(connection):
+    """
+    Give a connection back, the last user closes the port.
+    """
+    with _connections_lock:
+        connection.users -= 1
+        if connection.users > 0: return
+        if _connections.get(connection.port) is connection:
+            del _connections[connection.port]
+    connection.close()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import itertools
+import threading
+import time
+import traceback
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import serial
+
+from motor_connection import DEFAULT_TIMEOUT, READ_POLL
+
+##################################################
+# Constants
+##################################################
+# responses of the motorControlShell, the most specific first
+RESPONSES = ('OK, done', 'Waiting', 'FINISH', 'OK')
+COMMAND_STATES = ('pending', 'done', 'timeout', 'cancelled', 'error')
+# queue order of commands and of the end of the thread
+_COMMAND = 0
+_STOP = 1
+
+def parse_response(line):
+    """
+    Get the response a line of the controller carries.
+
+    Returns:
+        one of RESPONSES, None for other output like echoes
+    """
+    for response in RESPONSES:
+        if response in line: return response
+    return None
+
+##################################################
+# Motor command
+##################################################
+class motor_command(object):
+    """
+    A command line and the responses that complete it.
+
+    The state is 'pending' until the driver is done with the command,
+    then one of COMMAND_STATES. The responses seen so far are in
+    received, an I/O error in error.
+    """
+
+    def __init__(self, line, responses, timeout, callback):
+        self.line = line
+        self.responses = tuple(responses)
+        self.timeout = timeout
+        self.callback = callback
+        self.state = 'pending'
+        self.received = []
+        self.error = None
+        self.generation = 0
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        Wait until the command is done.
+
+        Returns:
+            the state of the command
+        """
+        self._done.wait(timeout)
+        return self.state
+
+    def finish(self, state, error=None):
+        self.state = state
+        self.error = error
+        self._done.set()
+        if self.callback is None: return
+        try: self.callback(self)
+        except Exception: traceback.print_exc()
+
+##################################################
+# Motor driver
+##################################################
+class motor_driver(object):
+    """
+    Run the commands of a motor controller on a thread of its own.
+
+    Commands are submitted without blocking and run in order. The
+    driver sends a command, parses the responses and completes it when
+    all expected responses arrived, or with 'timeout' when its deadline
+    passes first. The callback of a command runs on the driver thread.
+
+    kill() preempts everything: it is written on the connection at once,
+    the running command is abandoned and the queued ones are cancelled.
+    """
+
+    def __init__(self, connection):
+        """
+        Create a new driver and start its thread.
+
+        Args:
+            connection: the motor_connection.serial_connection to use
+        """
+        self.connection = connection
+        self._queue = queue.PriorityQueue()
+        self._count = itertools.count()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, line, responses=('OK',), timeout=DEFAULT_TIMEOUT,
+               callback=None):
+        """
+        Queue a command.
+
+        Args:
+            line: the command line, e.g. 'mf 16'
+            responses: the responses that complete it, in order
+            timeout: seconds from sending until it must be complete,
+                     None to wait forever
+            callback: optional callable, gets the command when done
+
+        Returns:
+            the motor_command
+        """
+        command = motor_command(line, responses, timeout, callback)
+        with self._lock:
+            command.generation = self._generation
+            self._queue.put((_COMMAND, next(self._count), command))
+        return command
+
+    def kill(self):
+        """
+        Stop the motor now and drop all other commands.
+        """
+        cancelled = []
+        with self._lock:
+            self._generation += 1
+            while True:
+                try: entry = self._queue.get_nowait()
+                except queue.Empty: break
+                if entry[2] is None: self._queue.put(entry) # stop()
+                else: cancelled.append(entry[2])
+        try:
+            self.connection.sendline('kill')
+        finally:
+            for command in cancelled: command.finish('cancelled')
+
+    def stop(self):
+        """
+        Finish the queued commands and end the driver thread.
+        """
+        self._queue.put((_STOP, next(self._count), None))
+
+    def join(self, timeout=None):
+        """
+        Wait until the thread ended after stop(), only then nothing
+        uses the connection any more.
+        """
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            command = self._queue.get()[2]
+            if command is None: return
+            if command.generation != self._generation:
+                command.finish('cancelled')
+                continue
+            command.finish(*self._execute(command))
+
+    def _execute(self, command):
+        deadline = None if command.timeout is None else \
+            time.time() + command.timeout
+        expected = list(command.responses)
+        try:
+            with self.connection.read_lock:
+                # responses of abandoned commands must not complete this one
+                self.connection.discard()
+                self.connection.sendline(command.line)
+                while expected:
+                    if command.generation != self._generation:
+                        return ('cancelled',)
+                    wait = READ_POLL
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.time())
+                        if wait <= 0: return ('timeout',)
+                    line = self.connection.readline(wait)
+                    response = None if line is None else parse_response(line)
+                    if response is None: continue
+                    command.received.append(response)
+                    if response == expected[0]: expected.pop(0)
+        except (OSError, serial.SerialException) as error:
+            return ('error', error)
+        return ('done',)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import collections
+import heapq
+import itertools
+import os
+import random
+import select
+import threading
+import time
+import tty
+import numpy
+from gnuradio import gr
+
+##################################################
+# Constants
+##################################################
+PULSES_PER_REVOLUTION = 1600 # 1.8 degree steps, 1/8 microstepping
+DEFAULT_SPEED = 960 # pulses/second
+MAX_SEGMENTS = 64 # motion history kept for received_power
+
+def dipole_pattern(angles):
+    """
+    The pattern of a half wave dipole along the 90 degree axis in dB,
+    clipped at -30 dB.
+    """
+    return 10*numpy.log10(numpy.maximum(numpy.cos(angles)**2, 1e-3))
+
+##################################################
+# Motor controller simulator
+##################################################
+class motor_simulator(object):
+    """
+    A NUCLEO motor controller on a pseudo terminal.
+
+    Speaks the motorControlShell protocol: 'C' and 'B' turn one
+    revolution forward and back and answer OK, then FINISH; 'mf n' and
+    'mb n' move n pulses and answer OK; 'wait' answers Waiting, then
+    'OK, done' once the motor stands still; 'set speed n' sets the
+    pulses per second; 'kill' stops at once.
+
+    Every response is delayed by latency. With drop_rate a response is
+    lost, with stall_rate a move never finishes, both at random, for
+    testing the failure handling of the driver.
+
+    The motion is recorded, received_power() gives the samples a
+    receiver would see from a pattern at the simulated angles.
+    """
+
+    def __init__(self, speed=DEFAULT_SPEED, latency=0.0, drop_rate=0.0,
+                 stall_rate=0.0, pattern=dipole_pattern, noise=0.0,
+                 seed=None):
+        """
+        Create a simulator and start serving its port.
+
+        Args:
+            speed: the rotation speed in pulses per second
+            latency: seconds from a command to its first response
+            drop_rate: probability that a response is lost
+            stall_rate: probability that a move never finishes
+            pattern: callable of angles in radians to received power
+            noise: standard deviation of noise added to the power
+            seed: seed of the random failures and noise
+        """
+        self.speed = speed
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.stall_rate = stall_rate
+        self.pattern = pattern
+        self.noise = noise
+        self.commands = []
+        self._random = random.Random(seed)
+        self._noise = numpy.random.RandomState(seed)
+        self._lock = threading.Lock()
+        self._events = []
+        self._count = itertools.count()
+        self._motion = 0 # number of the current move, stops old events
+        # (start time, start angle, radians per second, end time, end angle)
+        self._segments = collections.deque(
+            [(0.0, 0.0, 0.0, 0.0, 0.0)], MAX_SEGMENTS)
+        self._waiting = False
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    ##################################################
+    # Motion
+    ##################################################
+    def angle(self, now=None):
+        """
+        Get the angle of the motor in radians, not wrapped.
+        """
+        return float(self.angles(numpy.array(
+            (time.time() if now is None else now,)))[0])
+
+    def angles(self, times):
+        """
+        Get the angles of the motor in radians at some times, as far
+        back as the motion history goes.
+        """
+        with self._lock:
+            segments = numpy.array(self._segments)
+        index = numpy.maximum(numpy.searchsorted(
+            segments[:, 0], times, 'right') - 1, 0)
+        start, angle, rate, end, final = segments[index].T
+        # the end angle is exact, a revolution ends at 2 pi
+        return numpy.where(times >= end, final,
+            angle + rate * (numpy.clip(times, start, end) - start))
+
+    def moving(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._segments[-1][3] > now
+
+    def received_power(self, times):
+        """
+        Get the power a receiver sees at some times.
+
+        Args:
+            times: array of time.time() values
+
+        Returns:
+            the pattern at the angle of the motor, plus noise
+        """
+        power = self.pattern(self.angles(numpy.asarray(times)) % (2*numpy.pi))
+        if self.noise:
+            power = power + self._noise.normal(0, self.noise, len(power))
+        return power
+
+    def _move(self, now, pulses):
+        """
+        Start a move of pulses, negative is backwards, infinite never ends.
+
+        Returns:
+            the time it ends
+        """
+        angle = self.angle(now)
+        duration = abs(pulses) / float(self.speed)
+        rate = numpy.sign(pulses) * 2*numpy.pi*self.speed / PULSES_PER_REVOLUTION
+        final = angle + 2*numpy.pi*pulses / PULSES_PER_REVOLUTION
+        with self._lock:
+            self._motion += 1
+            self._segments.append((now, angle, rate, now + duration, final))
+        return now + duration
+
+    def _stop(self, now):
+        angle = self.angle(now)
+        with self._lock:
+            self._motion += 1
+            self._segments.append((now, angle, 0.0, now, angle))
+
+    ##################################################
+    # Protocol
+    ##################################################
+    def _respond(self, at, text, motion=None):
+        """
+        Schedule a response, or drop it at drop_rate. A response for a
+        move is not sent if another move started in between.
+        """
+        if self._random.random() < self.drop_rate: return
+        heapq.heappush(self._events, (at, next(self._count), text, motion))
+
+    def _command(self, line, now):
+        self.commands.append(line)
+        words = line.split()
+        at = now + self.latency
+        if not words: return
+        if line == 'kill':
+            self._stop(now)
+            return
+        if words[0] in ('C', 'B', 'mf', 'mb'):
+            if words[0] in ('C', 'B'): pulses = PULSES_PER_REVOLUTION
+            else:
+                try: pulses = int(words[1])
+                except (IndexError, ValueError): return self._respond(at, 'ERROR')
+            if words[0] in ('B', 'mb'): pulses = -pulses
+            self._respond(at, 'OK')
+            # a stalled motor turns forever, no FINISH
+            stalled = self._random.random() < self.stall_rate
+            if stalled: pulses = numpy.sign(pulses) * numpy.inf
+            end = self._move(at, pulses)
+            if words[0] in ('C', 'B') and not stalled:
+                self._respond(end, 'FINISH', self._motion)
+            return
+        if words[:2] == ['set', 'speed'] and len(words) == 3:
+            try: self.speed = max(int(words[2]), 1)
+            except ValueError: return self._respond(at, 'ERROR')
+            return self._respond(at, 'OK')
+        if line == 'wait':
+            self._respond(at, 'Waiting')
+            self._waiting = True
+            return
+        self._respond(at, 'ERROR')
+
+    def _run(self):
+        buf = b''
+        while self._running:
+            now = time.time()
+            while self._events and self._events[0][0] <= now:
+                at, n, text, motion = heapq.heappop(self._events)
+                if motion is not None and motion != self._motion: continue
+                os.write(self._master, (text + '\r\n').encode('ascii'))
+            if self._waiting and not self.moving(now):
+                self._waiting = False
+                self._respond(now + self.latency, 'OK, done')
+                continue
+            timeout = 0.05
+            if self._events: timeout = min(timeout, max(self._events[0][0] - now, 0))
+            readable = select.select([self._master], [], [], timeout)[0]
+            if not readable: continue
+            try: buf += os.read(self._master, 1024)
+            except OSError: continue # the client closed the port
+            while b'\n' in buf:
+                line, buf = buf.split(b'\n', 1)
+                self._command(line.decode('ascii', 'replace').strip(),
+                    time.time())
+
+##################################################
+# Simulated receiver
+##################################################
+class simulated_receiver(gr.sync_block):
+    """
+    The power a receiver sees from the antenna on a motor_simulator.
+
+    Sample n is taken at the time start + n / sample_rate. work() waits
+    until the next sample is due and produces those whose time has come,
+    so the stream runs in real time on the clock of the simulated motor,
+    like the samples of a receiver do.
+    """
+
+    def __init__(self, simulator, sample_rate):
+        """
+        Create a new simulated receiver.
+
+        Args:
+            simulator: the motor_simulator that turns the antenna
+            sample_rate: the output sample rate
+        """
+        gr.sync_block.__init__(self,
+            name="simulated_receiver",
+            in_sig=None,
+            out_sig=[numpy.float32])
+        self._simulator = simulator
+        self._sample_rate = float(sample_rate)
+        self.restart()
+
+    def restart(self):
+        """
+        Take the next sample now, the sample clock starts over.
+        """
+        self._pending_start = time.time()
+
+    def work(self, input_items, output_items):
+        if self._pending_start is not None:
+            self._start, self._pending_start = self._pending_start, None
+            self._produced = 0
+        out = output_items[0]
+        due = self._start + self._produced / self._sample_rate
+        now = time.time()
+        if now < due:
+            time.sleep(due - now)
+            now = due
+        n = int((now - self._start) * self._sample_rate) + 1 - self._produced
+        n = min(max(n, 1), len(out))
+        times = self._start + \
+            (self._produced + numpy.arange(n)) / self._sample_rate
+        out[:n] = self._simulator.received_power(times)
+        self._produced += n
+        return n
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Simulate the motor controller on a pseudo terminal")
+    parser.add_argument('--speed', type=int, default=DEFAULT_SPEED)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--stall-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    simulator = motor_simulator(args.speed, args.latency, args.drop_rate,
+        args.stall_rate)
+    print(simulator.port)
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.close()
+
+if __name__ == '__main__':
+    main()
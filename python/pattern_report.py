@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import multiprocessing
+import os
+import numpy
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from polar_renderer import style_polar_axes, TRACE_COLOR
+from display_scale import DISPLAY_SCALES, DISPLAY_SCALE_LABELS
+from autoscale import autoscale
+
+##################################################
+# Constants
+##################################################
+DEFAULT_TITLE = 'Radiation pattern'
+DEFAULT_FIGSIZE = (3.0, 3.0)
+DEFAULT_DPI = 100
+DEFAULT_FORMAT = 'png'
+
+##################################################
+# Stored patterns
+##################################################
+def save_pattern(filename, angles, values, title=DEFAULT_TITLE, scale=None):
+    """
+    Store a pattern as a numpy .npz file.
+
+    Args:
+        filename: the file to write
+        angles: the angles of the bins in radians
+        values: one value per bin, NaN for empty bins
+        title: the title of its plot
+        scale: the display scale of the values, one of DISPLAY_SCALES
+    """
+    numpy.savez(filename, angles=angles, values=values, title=title,
+        scale=scale or '')
+
+def load_pattern(filename):
+    """
+    Load a pattern stored by save_pattern.
+
+    Returns:
+        a dict of angles, values, title and scale, None if not stored
+    """
+    data = numpy.load(filename)
+    title = str(data['title']) if 'title' in data.files else DEFAULT_TITLE
+    scale = str(data['scale']) if 'scale' in data.files else ''
+    return dict(angles=data['angles'], values=data['values'], title=title,
+        scale=scale or None)
+
+##################################################
+# Rendering
+##################################################
+# Nothing here needs wx or a display: the figures are drawn by the Agg
+# canvas directly, without pyplot, so the backend the windows select
+# does not matter.
+def render_pattern(filename, angles, values, title=DEFAULT_TITLE,
+                   minval=None, maxval=None, figsize=DEFAULT_FIGSIZE,
+                   dpi=DEFAULT_DPI, scale=None):
+    """
+    Render a pattern into an image file.
+
+    Args:
+        filename: the file to write, its extension selects the format
+        angles: the angles of the bins in radians
+        values: one value per bin, NaN for empty bins
+        title: the title of the plot
+        minval: the inner radius, None to scale to the data
+        maxval: the outer radius, None to scale to the data
+        scale: the display scale of the values, shown in the title
+
+    Returns:
+        the filename
+    """
+    fig = Figure(figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    axes = fig.add_subplot(111, projection='polar')
+    if scale in DISPLAY_SCALES:
+        title = "%s [%s]" % (title, DISPLAY_SCALE_LABELS[
+            DISPLAY_SCALES.index(scale)])
+    style_polar_axes(axes, title)
+    axes.plot(angles, values, linewidth=1, color=TRACE_COLOR)
+    values = numpy.asarray(values)
+    if minval is None or maxval is None:
+        limits = autoscale()
+        limits.add(values)
+        bounds = limits.limits(lambda: (numpy.nan, numpy.nan))
+        if bounds is not None:
+            if minval is None: minval = bounds[0]
+            if maxval is None: maxval = bounds[1]
+    if minval is not None and maxval is not None:
+        axes.set_ybound(lower=minval, upper=maxval)
+    fig.savefig(filename, facecolor=fig.get_facecolor())
+    return filename
+
+def _render_job(job):
+    job = dict(job)
+    source = job.pop('source', None)
+    if source is not None:
+        pattern = load_pattern(source)
+        pattern.update(job)
+        job = pattern
+    return render_pattern(**job)
+
+def render_patterns(jobs, processes=None):
+    """
+    Render many patterns on a pool of processes.
+
+    Args:
+        jobs: dicts of render_pattern arguments, or with 'source' the
+              .npz file of save_pattern instead of angles and values
+        processes: the number of processes, all cores if None
+
+    Returns:
+        the filenames, in the order of the jobs
+    """
+    jobs = list(jobs)
+    if processes == 1 or len(jobs) < 2:
+        return map(_render_job, jobs)
+    pool = multiprocessing.Pool(processes)
+    try:
+        # the workers load their own patterns, only names are pickled
+        workers = processes or multiprocessing.cpu_count()
+        chunksize = max(len(jobs) // (4 * workers), 1)
+        return pool.map(_render_job, jobs, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+def render_files(sources, out_dir, fmt=DEFAULT_FORMAT, processes=None,
+                 **kwargs):
+    """
+    Render stored patterns into out_dir, one image per file.
+
+    Args:
+        sources: the .npz files of save_pattern
+        out_dir: the directory for the images
+        fmt: the image format, e.g. 'png' or 'pdf'
+        processes: the number of processes, all cores if None
+        kwargs: more render_pattern arguments for all files
+    """
+    jobs = []
+    for source in sources:
+        name = os.path.splitext(os.path.basename(source))[0]
+        job = dict(kwargs, source=source,
+            filename=os.path.join(out_dir, "%s.%s" % (name, fmt)))
+        jobs.append(job)
+    return render_patterns(jobs, processes)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Render stored radiation patterns to image files")
+    parser.add_argument('out_dir')
+    parser.add_argument('sources', nargs='+', help=".npz pattern files")
+    parser.add_argument('-f', '--format', default=DEFAULT_FORMAT)
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('--minval', type=float, default=None)
+    parser.add_argument('--maxval', type=float, default=None)
+    args = parser.parse_args()
+    for filename in render_files(args.sources, args.out_dir, args.format,
+            args.processes, minval=args.minval, maxval=args.maxval):
+        print(filename)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+
+from angle_grid import get_angle_grid
+
+##################################################
+# Constants
+##################################################
+DEFAULT_BIN_WIDTH = 1.0 # degrees
+
+def num_bins(bin_width):
+    """
+    Get the number of bins per revolution for a bin width in degrees.
+    """
+    return max(1, int(round(360.0/bin_width)))
+
+##################################################
+# Angle binned pattern accumulator
+##################################################
+class pattern_accumulator(object):
+    """
+    Running statistics of samples per angle bin.
+
+    Each bin holds the count, sum, sum of squares, minimum and maximum
+    of the samples that fell into it, so mean and variance per bearing
+    are available at any time. The resolution is set by the bin width
+    alone and does not depend on the sample rate.
+
+    Bins can optionally be tagged with a sweep number: a sample of a newer
+    sweep restarts its bin, a sample of an older sweep is ignored. This
+    keeps exactly the latest revolution without tracking which bins it
+    has already touched.
+
+    Every bin that changes is marked dirty, take_dirty() hands the marks
+    to a renderer so it only redraws what changed since its last frame.
+    """
+
+    def __init__(self, bin_width=DEFAULT_BIN_WIDTH):
+        """
+        Create a new pattern accumulator.
+
+        Args:
+            bin_width: the width of an angle bin in degrees
+        """
+        self.nbins = num_bins(bin_width)
+        self.grid = get_angle_grid(self.nbins)
+        self.bin_width = 360.0/self.nbins
+        self._bin_rad = 2*numpy.pi/self.nbins
+        self.count = numpy.zeros(self.nbins, numpy.int64)
+        self.sum = numpy.zeros(self.nbins, numpy.float64)
+        self.sumsq = numpy.zeros(self.nbins, numpy.float64)
+        self.minima = numpy.empty(self.nbins, numpy.float32)
+        self.maxima = numpy.empty(self.nbins, numpy.float32)
+        self.sweep = numpy.zeros(self.nbins, numpy.int64)
+        self.dirty = numpy.zeros(self.nbins, bool)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all samples.
+        """
+        self.clear(slice(None))
+        self.sweep.fill(0)
+
+    def clear(self, bins):
+        """
+        Forget the samples of some bins.
+
+        Args:
+            bins: index, slice or mask of the bins to clear
+        """
+        self.count[bins] = 0
+        self.sum[bins] = 0
+        self.sumsq[bins] = 0
+        self.minima[bins] = numpy.nan
+        self.maxima[bins] = numpy.nan
+        self.dirty[bins] = True
+
+    def take_dirty(self):
+        """
+        Get the bins changed since the last call and clear the marks.
+
+        Returns:
+            array of bin indices, in increasing order
+        """
+        bins = numpy.flatnonzero(self.dirty)
+        self.dirty[bins] = False
+        return bins
+
+    def angles(self):
+        """
+        Get the centre angle of every bin in radians, a shared
+        read-only array.
+        """
+        return self.grid.angles
+
+    def bin_index(self, angles):
+        """
+        Map angles in radians to bin indices, wrapping around.
+        """
+        return numpy.floor(numpy.asarray(angles)/self._bin_rad) \
+                .astype(numpy.int64) % self.nbins
+
+    def add(self, angles, values, sweeps=None):
+        """
+        Fold samples into their bins.
+
+        Args:
+            angles: array of sample angles in radians
+            values: array of samples
+            sweeps: optional sweep number, scalar or one per sample
+        """
+        self.add_bins(self.bin_index(angles), values, sweeps)
+
+    def add_bins(self, bins, values, sweeps=None):
+        """
+        Fold samples into the given bins. NaN samples are skipped.
+
+        Args:
+            bins: array of bin indices in [0, nbins)
+            values: array of samples
+            sweeps: optional sweep number, scalar or one per sample
+        """
+        values = numpy.asarray(values)
+        valid = ~numpy.isnan(values)
+        bins, values = bins[valid], values[valid]
+        if sweeps is not None:
+            sweeps = (sweeps + numpy.zeros(len(valid), numpy.int64))[valid]
+            newest = self.sweep.copy()
+            numpy.maximum.at(newest, bins, sweeps)
+            stale = newest > self.sweep
+            self.clear(stale)
+            self.sweep[stale] = newest[stale]
+            current = sweeps == self.sweep[bins]
+            bins, values = bins[current], values[current]
+        if not len(bins): return
+        self.count += numpy.bincount(bins, minlength=self.nbins)
+        self.sum += numpy.bincount(bins, values, self.nbins)
+        self.sumsq += numpy.bincount(bins, values*values, self.nbins)
+        # fmax/fmin ignore the NaN of empty bins
+        numpy.fmax.at(self.maxima, bins, values)
+        numpy.fmin.at(self.minima, bins, values)
+        self.dirty[bins] = True
+
+    def mean(self, bins=None):
+        """
+        Get the mean of every bin, NaN for empty bins.
+
+        Args:
+            bins: optional indices, to get the mean of these bins only
+        """
+        if bins is None: bins = slice(None)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return self.sum[bins] / self.count[bins]
+
+    def variance(self):
+        """
+        Get the variance of every bin, NaN for empty bins.
+        """
+        mean = self.mean()
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            var = self.sumsq / self.count - mean*mean
+        # rounding can push a constant bin slightly below zero
+        return numpy.clip(var, 0, None, out=var)
+
+##################################################
+# Revolution tracking
+##################################################
+class sweep_tracker(object):
+    """
+    Split the bins of an angle_binner into revolutions.
+
+    The bins go into a pattern_accumulator, tagged with their revolution
+    so a newer one replaces the older, unless values are kept. Before
+    the first bin of a newer revolution is added, the mean of the
+    completed one is handed to archive, e.g. to show it as a previous
+    sweep. One batch of bins may complete several revolutions.
+    """
+
+    def __init__(self, pattern, archive):
+        """
+        Create a new sweep tracker.
+
+        Args:
+            pattern: the pattern_accumulator to fill
+            archive: callable, gets the mean of every completed revolution
+        """
+        self.pattern = pattern
+        self.archive = archive
+        self.revolution = 0
+
+    def reset(self):
+        """
+        Start over at revolution zero with an empty pattern.
+        """
+        self.pattern.reset()
+        self.revolution = 0
+
+    def restart(self):
+        """
+        Start over like reset(), for the next measurement. The pattern
+        of the finished one is handed to archive first, if it has bins.
+        """
+        if self.pattern.count.any(): self.archive(self.pattern.mean())
+        self.reset()
+
+    def add(self, bins, values, keep=False, passes=1):
+        """
+        Add a batch of bins.
+
+        Args:
+            bins: array of absolute bin numbers, in increasing revolutions
+            values: array of values
+            keep: True to keep the values of older revolutions
+            passes: the number of revolutions that make one sweep
+        """
+        if not len(bins): return
+        revolutions = bins // (self.pattern.nbins * passes)
+        starts = numpy.concatenate(([0],
+            numpy.flatnonzero(numpy.diff(revolutions)) + 1))
+        ends = numpy.append(starts[1:], len(bins))
+        for a, b in zip(starts, ends):
+            revolution = revolutions[a]
+            if revolution > self.revolution:
+                self.archive(self.pattern.mean())
+                self.revolution = revolution
+            self.pattern.add_bins(bins[a:b] % self.pattern.nbins, values[a:b],
+                None if keep else revolution)
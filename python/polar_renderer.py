@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import collections
+import threading
+import numpy
+
+from matplotlib.transforms import Bbox
+
+##################################################
+# Styling
+##################################################
+BACKGROUND_COLOR = '#444444'
+GRID_COLOR = 'gray'
+TRACE_COLOR = (1, 1, 0)
+DEFAULT_SECTORS = 36
+REGION_PAD = 2 # pixels around a region, for line width and antialiasing
+
+def set_background(axes, color):
+    """
+    Set the background color of axes on any matplotlib version.
+    """
+    # set_facecolor replaces set_axis_bgcolor since matplotlib 2.0
+    setter = getattr(axes, 'set_facecolor', None) or axes.set_axis_bgcolor
+    setter(color)
+
+def style_polar_axes(axes, title, title_size=10):
+    """
+    Give polar axes the look of the live windows, the offscreen
+    reports use the same.
+
+    Args:
+        axes: the polar axes
+        title: the title of the plot
+        title_size: the font size of the title
+    """
+    set_background(axes, BACKGROUND_COLOR)
+    axes.set_title(title, size=title_size)
+    axes.set_xbound(lower=0, upper=2*numpy.pi)
+    axes.grid(True, color=GRID_COLOR)
+    for label in axes.get_xticklabels() + axes.get_yticklabels():
+        label.set_fontsize(8)
+        label.set_visible(True)
+
+##################################################
+# Level of detail
+##################################################
+def angular_columns(radius):
+    """
+    Get the number of angular pixel columns of a polar plot, the
+    length of its outer circle in pixels.
+
+    Args:
+        radius: the radius of the plot in pixels
+    """
+    return max(int(numpy.ceil(2*numpy.pi*radius)), 1)
+
+def set_grid_data(line, grid, positions, values):
+    """
+    Set the points of a line at positions of an angle_grid.
+
+    A trace of the wx backend looks up the cosine and sine of the
+    positions in the grid tables, a matplotlib line gets their angles.
+
+    Args:
+        line: the line to set
+        grid: the angle_grid
+        positions: indices into the tables of the grid ending in 2
+        values: one value per position
+    """
+    set_data = getattr(line, 'set_grid_data', None)
+    if set_data is not None: set_data(grid, positions, values)
+    else: line.set_data(grid.angles2[positions], values)
+
+def decimate_minmax(angles, values, columns):
+    """
+    Reduce a trace to the minimum and maximum of every angular column.
+
+    The points are split into columns of consecutive samples, each
+    column becomes two points: its minimum at its first angle and its
+    maximum at its last angle. Nulls and peaks stay visible, and the
+    number of points is bounded by the size of the plot. NaN values are
+    ignored, a column of NaN stays a gap. Traces that fit are returned
+    as they are.
+
+    Args:
+        angles: the angles of the points, or their grid positions
+        values: the values of the points
+        columns: the number of angular pixel columns
+
+    Returns:
+        a tuple of angles and values
+    """
+    n = len(values)
+    if n <= 2*columns: return angles, values
+    starts = (numpy.arange(columns) * n) // columns
+    ends = numpy.append(starts[1:], n) - 1
+    x = numpy.empty(2*columns, numpy.asarray(angles).dtype)
+    x[0::2] = angles[starts]
+    x[1::2] = angles[ends]
+    y = numpy.empty(2*columns, numpy.asarray(values).dtype)
+    y[0::2] = numpy.fmin.reduceat(values, starts)
+    y[1::2] = numpy.fmax.reduceat(values, starts)
+    return x, y
+
+##################################################
+# Blitting renderer
+##################################################
+class blit_renderer(object):
+    """
+    Redraw only the changing artists of a figure.
+
+    The artists are marked animated, so a full canvas draw renders
+    everything else: axes, grid, ticks and title. That result is cached
+    as background after every full draw. A frame then restores the
+    background and blits the artists on top of it. Only a change of the
+    radial bounds, or a resize, needs a full draw again.
+    """
+
+    def __init__(self, canvas, axes, artists):
+        """
+        Create a new blitting renderer.
+
+        Args:
+            canvas: the matplotlib canvas, must support blitting
+            axes: the polar axes
+            artists: the artists that change from frame to frame
+        """
+        self.canvas = canvas
+        self.axes = axes
+        self.figure = axes.figure
+        self.artists = list(artists)
+        for artist in self.artists:
+            artist.set_animated(True)
+        self._background = None
+        self._ybound = None
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def needs_full(self):
+        """
+        Tell if the next frame is a full draw, all artists must be
+        up to date then.
+        """
+        return self._background is None
+
+    def extent(self, artist):
+        """
+        Get the region an artist covers, in display coordinates.
+
+        Returns:
+            (x0, y0, x1, y1), or None if unknown or empty
+        """
+        try:
+            x0, y0, x1, y1 = artist.get_window_extent(
+                self.canvas.get_renderer()).extents
+        except Exception:
+            return None
+        if not (x0 <= x1 and y0 <= y1): return None
+        return x0, y0, x1, y1
+
+    def set_ybound(self, lower, upper):
+        """
+        Set the radial bounds, a change invalidates the background.
+        """
+        if (lower, upper) == self._ybound: return
+        self._ybound = (lower, upper)
+        self.axes.set_ybound(lower=lower, upper=upper)
+        self._background = None
+
+    def invalidate(self):
+        """
+        Render the background again with the next frame, after a
+        change of the artists that are not animated.
+        """
+        self._background = None
+
+    def add_static(self, angles, values, color):
+        """
+        Add a trace that is part of the cached background.
+
+        Returns:
+            a handle for remove_static
+        """
+        line = self.axes.plot(angles, values, linewidth=1, color=color)[0]
+        self._background = None
+        return line
+
+    def remove_static(self, line):
+        line.remove()
+        self._background = None
+
+    def columns(self):
+        """
+        Get the number of angular pixel columns of the axes.
+        """
+        bbox = self.axes.bbox
+        return angular_columns(min(bbox.width, bbox.height) / 2.0)
+
+    def draw(self, regions=None):
+        """
+        Render one frame.
+
+        Args:
+            regions: optional list of extents that changed, only these
+                are restored, redrawn and blitted
+        """
+        if self._background is None:
+            # _on_draw caches the background and adds the artists
+            self.canvas.draw()
+            return
+        if regions is None:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(self.figure.bbox)
+            return
+        if not regions: return
+        width, height = self.figure.bbox.width, self.figure.bbox.height
+        x0 = max(min(r[0] for r in regions) - REGION_PAD, 0)
+        y0 = max(min(r[1] for r in regions) - REGION_PAD, 0)
+        x1 = min(max(r[2] for r in regions) + REGION_PAD, width)
+        y1 = min(max(r[3] for r in regions) + REGION_PAD, height)
+        if x0 >= x1 or y0 >= y1: return
+        # the background covers the whole figure, with its pixel rows
+        # counted from the top
+        self.canvas.restore_region(self._background,
+            bbox=(x0, height - y1, x1, height - y0), xy=(0, 0))
+        region = Bbox.from_extents(x0, y0, x1, y1)
+        for artist in self.artists:
+            if not artist.get_visible(): continue
+            extent = self.extent(artist)
+            if extent is None or region.overlaps(Bbox.from_extents(*extent)):
+                self.figure.draw_artist(artist)
+        self.canvas.blit(region)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.figure.draw_artist(artist)
+
+##################################################
+# Sector trace
+##################################################
+class sector_trace(object):
+    """
+    A trace of one value per bin, split into one line per sector of
+    consecutive bins.
+
+    Updating some bins only touches the lines of their sectors. The
+    extents of those lines before and after the update are the regions
+    of the plot that changed, a renderer restores and blits only these,
+    so a frame costs in proportion to the new data rather than to the
+    whole revolution.
+    """
+
+    def __init__(self, plot, grid, sectors=DEFAULT_SECTORS):
+        """
+        Create a new sector trace.
+
+        Args:
+            plot: callable creating an empty line
+            grid: the angle_grid of the bins
+            sectors: the number of lines
+        """
+        n = grid.nbins
+        self.grid = grid
+        sectors = max(min(sectors, n), 1)
+        self.nbins = n
+        self.starts = (numpy.arange(sectors + 1) * n) // sectors
+        # every line reaches to the first bin of the next one
+        self.ends = numpy.minimum(self.starts[1:] + 1, n)
+        self.positions = [grid.bins[a:b] for a, b in zip(self.starts, self.ends)]
+        self.lines = [plot() for i in range(sectors)]
+
+    def sectors(self, bins):
+        """
+        Get the sectors whose lines show any of the bins.
+        """
+        sector = numpy.searchsorted(self.starts, bins, 'right') - 1
+        # the first bin of a sector also ends the line before it
+        shared = sector[(self.starts[sector] == bins) & (sector > 0)] - 1
+        return numpy.unique(numpy.concatenate((sector, shared)))
+
+    def update(self, renderer, values, bins=None):
+        """
+        Set the values of some bins.
+
+        Args:
+            renderer: the renderer showing the lines
+            values: the value of every bin
+            bins: the bins that changed, None for all
+
+        Returns:
+            the list of regions that changed
+        """
+        if bins is None: sectors = range(len(self.lines))
+        else: sectors = self.sectors(bins)
+        columns = max(renderer.columns() // len(self.lines), 1)
+        regions = []
+        for s in sectors:
+            line = self.lines[s]
+            regions.append(renderer.extent(line))
+            positions, points = decimate_minmax(self.positions[s],
+                values[self.starts[s]:self.ends[s]], columns)
+            set_grid_data(line, self.grid, positions, points)
+            regions.append(renderer.extent(line))
+        return [r for r in regions if r is not None]
+
+##################################################
+# Overlay layer
+##################################################
+REFERENCE_COLOR = (0.9, 0.9, 0.9)
+SWEEP_COLOR = (0.5, 0.5, 1)
+
+class overlay_layer(object):
+    """
+    Named traces that never change, like a reference pattern or the
+    previous sweeps, drawn into the cached background of a renderer.
+
+    Adding or removing a trace redraws the background once, a frame only
+    blits the live traces on top of it. Changes can be requested from any
+    thread, apply() carries them out in the GUI thread. The values are
+    kept as given, and passed through the transform when drawn, so a new
+    transform redraws all traces.
+    """
+
+    def __init__(self, renderer, keep=0, transform=None):
+        """
+        Create a new overlay layer.
+
+        Args:
+            renderer: a renderer with add_static and remove_static
+            keep: the number of previous sweeps to show
+            transform: optional callable from values to display values
+        """
+        self.renderer = renderer
+        self.keep = keep
+        self.transform = transform
+        self._values = {}
+        self._lock = threading.Lock()
+        self._pending = []
+        self._traces = collections.OrderedDict()
+        self._sweeps = collections.deque()
+        self._sweep_count = 0
+
+    def add(self, name, angles, values, color=REFERENCE_COLOR):
+        """
+        Add a trace, replacing one of the same name.
+        """
+        with self._lock:
+            self._pending.append((name, numpy.array(angles),
+                numpy.array(values), color))
+
+    def remove(self, name):
+        with self._lock:
+            self._pending.append((name, None, None, None))
+
+    def add_sweep(self, angles, values):
+        """
+        Add the pattern of a completed sweep, dropping the oldest ones
+        beyond keep.
+        """
+        if self.keep <= 0: return
+        with self._lock:
+            self._sweep_count += 1
+            name = "sweep %d" % self._sweep_count
+            self._sweeps.append(name)
+            self._pending.append((name, numpy.array(angles),
+                numpy.array(values), SWEEP_COLOR))
+            self._trim()
+
+    def set_transform(self, transform):
+        """
+        Change the transform, all traces are drawn again.
+        """
+        with self._lock:
+            self.transform = transform
+            for name in self._traces:
+                self._pending.append((name,) + self._values[name])
+
+    def set_keep(self, keep):
+        with self._lock:
+            self.keep = max(int(keep), 0)
+            self._trim()
+
+    def _trim(self):
+        while len(self._sweeps) > self.keep:
+            self._pending.append((self._sweeps.popleft(), None, None, None))
+
+    def names(self):
+        return list(self._traces)
+
+    def apply(self):
+        """
+        Carry out the requested changes, call from the GUI thread.
+
+        Returns:
+            True if the background changed
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending: return False
+        columns = self.renderer.columns()
+        for name, angles, values, color in pending:
+            if name in self._traces:
+                self.renderer.remove_static(self._traces.pop(name))
+                del self._values[name]
+            if values is None: continue
+            self._values[name] = (angles, values, color)
+            if self.transform is not None:
+                values = self.transform(values)
+            angles, values = decimate_minmax(angles, values, columns)
+            self._traces[name] = self.renderer.add_static(
+                angles, values, color)
+        return True
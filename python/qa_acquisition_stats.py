@@ -0,0 +1,58 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+from gnuradio import gr, gr_unittest
+from ring_buffer import spsc_ring
+from acquisition_stats import latency_histogram, acquisition_stats, \
+        MESSAGES_IN_KEY, OVERRUNS_KEY, HANDLE_LATENCY_KEY
+
+class fake_binner (object):
+    samples_in = 0
+
+class qa_acquisition_stats (gr_unittest.TestCase):
+
+    def test_001_histogram (self):
+        hist = latency_histogram()
+        for ms in (1, 1, 1, 1, 100):
+            hist.add(ms * 1e-3)
+        self.assertEqual(hist.count, 5)
+        self.assertAlmostEqual(hist.mean(), 20.8e-3)
+        self.assertAlmostEqual(hist.max, 0.1)
+        # the upper edge of the bucket, at most a quarter decade above
+        self.assertTrue(1e-3 <= hist.percentile(50) < 2e-3)
+        self.assertTrue(0.1 <= hist.percentile(99) < 0.2)
+
+    def test_002_publish (self):
+        controller = {}
+        ring = spsc_ring(2)
+        stats = acquisition_stats(controller, ring, fake_binner())
+        stats.handled(3, 0.002)
+        ring.write(numpy.zeros(2, numpy.float32))
+        ring.wait_space(0)
+        stats.publish()
+        self.assertEqual(controller[MESSAGES_IN_KEY], 1)
+        self.assertEqual(controller[OVERRUNS_KEY], 1)
+        self.assertEqual(controller[HANDLE_LATENCY_KEY].count, 1)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_acquisition_stats, "qa_acquisition_stats.xml")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+from angle_binner import angle_binner, make_ring
+
+class qa_angle_binner (gr_unittest.TestCase):
+
+    def setUp (self):
+        self.tb = gr.top_block ()
+
+    def tearDown (self):
+        self.tb = None
+
+    def run_binner (self, data, **kwargs):
+        src = blocks.vector_source_f(data)
+        ring = make_ring(kwargs['nbins'])
+        binner = angle_binner(ring, **kwargs)
+        self.tb.connect(src, binner)
+        self.tb.run()
+        records = ring.read()
+        return tuple(records['bin']), list(records['value'])
+
+    def test_001_mean (self):
+        # 4 bins per revolution, 2 samples per bin
+        bins, values = self.run_binner((1, 3, 5, 7, 2, 2, 4, 6, 9),
+            nbins=4, sample_rate=8, revolution_time=1)
+        self.assertEqual(bins, (0, 1, 2, 3))
+        # the bin of the last sample is never completed
+        self.assertFloatTuplesAlmostEqual(values, (2, 6, 2, 5))
+
+    def test_002_rms (self):
+        bins, values = self.run_binner((3, 4, 1),
+            nbins=4, sample_rate=8, revolution_time=1, average='rms')
+        self.assertFloatTuplesAlmostEqual(values, (numpy.sqrt(12.5),), 5)
+
+    def test_003_empty_bins (self):
+        # bins narrower than the sample spacing
+        bins, values = self.run_binner((1, 2, 3, 4),
+            nbins=4, sample_rate=2, revolution_time=1)
+        self.assertEqual(bins, (0, 1, 2, 3, 4, 5))
+        self.assertFloatTuplesAlmostEqual(values[::2], (1, 2, 3))
+        self.assertTrue(numpy.isnan(values[1::2]).all())
+
+    def test_004_no_revolution_time (self):
+        bins, values = self.run_binner((1, 2, 3),
+            nbins=4, sample_rate=2)
+        self.assertEqual(values, [])
+
+    def test_005_passes (self):
+        ring = make_ring(4)
+        binner = angle_binner(ring, nbins=4, sample_rate=4, revolution_time=1)
+        binner.start_pass('forward')
+        # input after the revolution is ignored
+        self.tb.connect(blocks.vector_source_f((1, 2, 3, 4, 5, 6, 7)), binner)
+        self.tb.run()
+        records = ring.read()
+        self.assertEqual(tuple(records['bin']), (0, 1, 2, 3))
+        # the reverse pass is the next sweep, mirrored
+        binner.start_pass('reverse')
+        tb = gr.top_block()
+        tb.connect(blocks.vector_source_f((1, 2, 3, 4, 5)), binner)
+        tb.run()
+        records = ring.read()
+        self.assertEqual(tuple(records['bin']), (7, 6, 5, 4))
+        self.assertFloatTuplesAlmostEqual(records['value'], (1, 2, 3, 4))
+
+    def test_006_power_db (self):
+        # 0 dB and 10 dB average to 5.5 times the power, not to 5 dB
+        bins, values = self.run_binner((0, 10, 1),
+            nbins=4, sample_rate=8, revolution_time=1, average='power_db')
+        self.assertFloatTuplesAlmostEqual(values,
+            (10*numpy.log10(5.5),), 5)
+
+    def test_007_measurements (self):
+        ring = make_ring(4)
+        binner = angle_binner(ring, nbins=4, sample_rate=4)
+        def feed(data):
+            tb = gr.top_block()
+            tb.connect(blocks.vector_source_f(data), binner)
+            tb.run()
+            return tuple(ring.read()['bin'])
+        # nothing is binned before the first measurement
+        self.assertEqual(feed((1, 2, 3, 4, 5)), ())
+        binner.start_pass('forward', 1)
+        self.assertEqual(feed((1, 2, 3, 4, 5)), (0, 1, 2, 3))
+        binner.start_pass('reverse')
+        self.assertEqual(feed((1, 2, 3, 4, 5)), (7, 6, 5, 4))
+        # the next measurement starts at sweep zero again
+        binner.start_pass('forward', 1)
+        self.assertEqual(feed((1, 2, 3, 4, 5)), (0, 1, 2, 3))
+        # even after a free running start
+        binner.set_revolution_time(1)
+        self.assertEqual(feed((1, 2, 3)), (0, 1))
+        binner.start_pass('forward', 1)
+        self.assertEqual(feed((1, 2, 3, 4, 5)), (0, 1, 2, 3))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_angle_binner, "qa_angle_binner.xml")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+from gnuradio import gr, gr_unittest
+from autoscale import autoscale
+
+class qa_autoscale (gr_unittest.TestCase):
+
+    def no_recompute (self):
+        self.fail("extrema recomputed")
+
+    def test_001_hysteresis (self):
+        scale = autoscale()
+        scale.add(numpy.array((0, 10), numpy.float32))
+        self.assertFloatTuplesAlmostEqual(
+            scale.limits(self.no_recompute), (-1, 11))
+        # inside the band, the limits stay
+        scale.add(numpy.array((9.5, 0.5), numpy.float32))
+        self.assertFloatTuplesAlmostEqual(
+            scale.limits(self.no_recompute), (-1, 11))
+        # leaving the band moves them
+        scale.add(numpy.array((20,), numpy.float32))
+        self.assertFloatTuplesAlmostEqual(
+            scale.limits(self.no_recompute), (-2, 22))
+
+    def test_002_lazy_retraction (self):
+        scale = autoscale()
+        scale.add(numpy.array((0, 10), numpy.float32))
+        scale.limits(self.no_recompute)
+        # removing a sample inside the extrema changes nothing
+        scale.remove(numpy.array((5,), numpy.float32))
+        scale.limits(self.no_recompute)
+        # removing an extremum recomputes, the data shrank to 1/10
+        scale.remove(numpy.array((10,), numpy.float32))
+        self.assertFloatTuplesAlmostEqual(
+            scale.limits(lambda: (0, 1)), (-0.1, 1.1))
+
+    def test_003_empty (self):
+        scale = autoscale()
+        self.assertEqual(scale.limits(lambda: (numpy.nan, numpy.nan)), None)
+
+    def test_004_invalidate (self):
+        scale = autoscale()
+        scale.add(numpy.array((0, 10.0)))
+        scale.invalidate()
+        calls = []
+        def extrema():
+            calls.append(1)
+            return (2.0, 8.0)
+        scale.limits(extrema)
+        self.assertEqual(len(calls), 1)
+        scale.limits(extrema)
+        self.assertEqual(len(calls), 1)
+
+    def test_005_small_values (self):
+        # linear power far below one keeps its magnitude
+        scale = autoscale()
+        scale.add(numpy.array((2e-6, 8e-6)))
+        lower, upper = scale.limits(self.no_recompute)
+        self.assertAlmostEqual(lower, 1.4e-6)
+        self.assertAlmostEqual(upper, 8.6e-6)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_autoscale, "qa_autoscale.xml")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+from gnuradio import gr, gr_unittest
+from display_scale import display_transform, to_linear, transform
+
+class qa_display_scale (gr_unittest.TestCase):
+
+    def test_001_scales (self):
+        power = to_linear(numpy.array((0, 10, 20, -10), numpy.float32), 'db')
+        display = display_transform(4)
+        self.assertFloatTuplesAlmostEqual(display.apply(power), (0, 10, 20, -10), 4)
+        display.set_scale('normalized')
+        self.assertFloatTuplesAlmostEqual(display.apply(power), (-20, -10, 0, -30), 4)
+        display.set_scale('linear')
+        self.assertFloatTuplesAlmostEqual(display.apply(power), power, 4)
+        self.assertFloatTuplesAlmostEqual(transform(power, 'normalized'),
+            (-20, -10, 0, -30), 4)
+
+    def test_002_only_changed_bins (self):
+        power = numpy.array((1, 10, 100, numpy.nan))
+        display = display_transform(4)
+        out = display.apply(power)
+        self.assertTrue(numpy.isnan(out[3]))
+        # unmarked bins keep their value
+        power[0] = 1000
+        power[1] = 1000
+        display.mark([1])
+        out = display.apply(power)
+        self.assertFloatTuplesAlmostEqual(out[:3], (0, 30, 20))
+        # a new peak moves all bins when normalized
+        display.set_scale('normalized')
+        display.apply(power)
+        power[2] = 1e4
+        display.mark([2])
+        self.assertFloatTuplesAlmostEqual(display.apply(power)[:3], (-10, -10, 0))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_display_scale, "qa_display_scale.xml")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import time
+import numpy
+import serial
+from gnuradio import gr, gr_unittest
+from motor_simulator import motor_simulator, simulated_receiver, \
+    dipole_pattern, PULSES_PER_REVOLUTION
+from angle_binner import angle_binner, make_ring
+import motor_connection
+from motor_connection import serial_connection
+from motor_driver import motor_driver
+
+# a revolution takes 0.1 s
+FAST = 10 * PULSES_PER_REVOLUTION
+
+class qa_motor_simulator (gr_unittest.TestCase):
+
+    def setUp (self):
+        self.simulators = []
+        self.drivers = []
+
+    def tearDown (self):
+        for driver in self.drivers:
+            driver.stop()
+            driver.join()
+            driver.connection.close()
+        for simulator in self.simulators:
+            simulator.close()
+
+    def connect (self, **kwargs):
+        simulator = motor_simulator(**kwargs)
+        self.simulators.append(simulator)
+        driver = motor_driver(serial_connection(simulator.port))
+        self.drivers.append(driver)
+        return simulator, driver
+
+    def test_001_round_trip (self):
+        simulator, driver = self.connect(speed=FAST, latency=0.01)
+        forward = driver.submit('C', ('OK', 'FINISH'), 2)
+        self.assertEqual(forward.wait(3), 'done')
+        self.assertEqual(forward.received, ['OK', 'FINISH'])
+        self.assertAlmostEqual(simulator.angle(), 2*numpy.pi, 6)
+        back = driver.submit('B', ('OK', 'FINISH'), 2)
+        self.assertEqual(back.wait(3), 'done')
+        self.assertAlmostEqual(simulator.angle(), 0, 6)
+        wait = driver.submit('wait', ('Waiting', 'OK, done'), 2)
+        self.assertEqual(wait.wait(3), 'done')
+
+    def test_002_kill (self):
+        simulator, driver = self.connect(speed=PULSES_PER_REVOLUTION)
+        move = driver.submit('C', ('OK', 'FINISH'), 5)
+        queued = driver.submit('mf 16')
+        time.sleep(0.2)
+        driver.kill()
+        self.assertEqual(move.wait(1), 'cancelled')
+        self.assertEqual(queued.wait(1), 'cancelled')
+        time.sleep(0.1)
+        self.assertFalse(simulator.moving())
+        self.assertEqual(simulator.commands, ['C', 'kill'])
+
+    def test_003_timeout (self):
+        simulator, driver = self.connect(speed=FAST, stall_rate=1)
+        move = driver.submit('C', ('OK', 'FINISH'), 0.3)
+        self.assertEqual(move.wait(2), 'timeout')
+        self.assertEqual(move.received, ['OK'])
+        # the stalled motor still turns, wait never sees it stand still
+        self.assertTrue(simulator.moving())
+        wait = driver.submit('wait', ('Waiting', 'OK, done'), 0.3)
+        self.assertEqual(wait.wait(2), 'timeout')
+        # the driver goes on with the next command
+        simulator.stall_rate = 0
+        self.assertEqual(driver.submit('mb 16').wait(2), 'done')
+
+    def test_004_measure (self):
+        # a revolution takes 1 s, the receiver stream is binned like
+        # during a measurement and gives back the pattern
+        nbins, sample_rate = 36, 3600
+        simulator, driver = self.connect(speed=PULSES_PER_REVOLUTION)
+        receiver = simulated_receiver(simulator, sample_rate)
+        ring = make_ring(nbins)
+        binner = angle_binner(ring, nbins, sample_rate, revolution_time=1,
+            average='power_db')
+        move = driver.submit('C', ('OK', 'FINISH'), 3)
+        binner.start_pass('forward')
+        receiver.restart()
+        out = numpy.empty(1024, numpy.float32)
+        records = []
+        while move.state == 'pending' or len(records) < nbins:
+            n = receiver.work([], [out])
+            binner.work([out[:n]], [])
+            records.extend(ring.read())
+            self.assertTrue(len(records) <= nbins)
+        self.assertEqual(move.state, 'done')
+        self.assertEqual([r['bin'] for r in records], list(range(nbins)))
+        # the mean power of the pattern over each bin
+        angles = (numpy.arange(nbins*100) + 0.5) * 2*numpy.pi / (nbins*100)
+        expected = (10**(dipole_pattern(angles) / 10)).reshape(nbins, 100)
+        # compared as linear power, the motor starts a few ms late
+        self.assertFloatTuplesAlmostEqual(
+            [10**(r['value'] / 10) for r in records],
+            expected.mean(axis=1), 1)
+
+    def test_005_ports (self):
+        first, second = [motor_simulator(speed=FAST) for i in range(2)]
+        self.simulators += [first, second]
+        connections = [motor_connection.acquire(port)
+            for port in (first.port, second.port, first.port)]
+        try:
+            # one connection per port
+            self.assertTrue(connections[0] is connections[2])
+            self.assertFalse(connections[0] is connections[1])
+            self.assertRaises(ValueError, motor_connection.acquire,
+                first.port, 9600)
+            # two rigs at once
+            drivers = [motor_driver(c) for c in connections[:2]]
+            self.drivers += drivers
+            moves = [d.submit('C', ('OK', 'FINISH'), 2) for d in drivers]
+            self.assertEqual([m.wait(3) for m in moves], ['done', 'done'])
+        finally:
+            for connection in connections:
+                motor_connection.release(connection)
+        self.assertEqual(motor_connection._connections, {})
+        # a released port is not opened again behind the pool's back
+        self.assertRaises(serial.SerialException, connections[0].sendline,
+            'mf 16')
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_motor_simulator, "qa_motor_simulator.xml")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import os
+import shutil
+import tempfile
+import numpy
+from gnuradio import gr, gr_unittest
+from angle_grid import get_angle_grid
+import pattern_report
+
+class qa_pattern_report (gr_unittest.TestCase):
+
+    def setUp (self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown (self):
+        shutil.rmtree(self.dir)
+
+    def test_001_batch (self):
+        angles = get_angle_grid(360).angles
+        sources = []
+        for i in range(3):
+            values = numpy.cos(angles * (i+1)).astype(numpy.float32)
+            values[:10] = numpy.nan
+            source = os.path.join(self.dir, "pattern%d.npz" % i)
+            pattern_report.save_pattern(source, angles, values)
+            sources.append(source)
+        images = list(pattern_report.render_files(sources, self.dir,
+            processes=2))
+        self.assertEqual([os.path.basename(f) for f in images],
+            ["pattern0.png", "pattern1.png", "pattern2.png"])
+        for image in images:
+            with open(image, 'rb') as f:
+                self.assertEqual(f.read(4), b'\x89PNG')
+
+    def test_002_pdf (self):
+        angles = get_angle_grid(36).angles
+        filename = os.path.join(self.dir, "pattern.pdf")
+        pattern_report.render_pattern(filename, angles, numpy.ones(36),
+            minval=0, maxval=2)
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(4), b'%PDF')
+
+    def test_003_scale (self):
+        angles = get_angle_grid(36).angles
+        source = os.path.join(self.dir, "pattern.npz")
+        pattern_report.save_pattern(source, angles, numpy.ones(36),
+            scale='db')
+        self.assertEqual(pattern_report.load_pattern(source)['scale'], 'db')
+        pattern_report.save_pattern(source, angles, numpy.ones(36))
+        self.assertEqual(pattern_report.load_pattern(source)['scale'], None)
+        images = list(pattern_report.render_files([source], self.dir,
+            processes=1))
+        self.assertEqual(len(images), 1)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_pattern_report, "qa_pattern_report.xml")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+from gnuradio import gr, gr_unittest
+from pattern_store import pattern_accumulator, sweep_tracker
+
+class qa_pattern_store (gr_unittest.TestCase):
+
+    def test_001_statistics (self):
+        acc = pattern_accumulator(90)
+        acc.add(numpy.array((0.1, 0.2, 1.7, 3.2)),
+                numpy.array((1, 3, 5, 7), numpy.float32))
+        self.assertEqual(tuple(acc.count), (2, 1, 1, 0))
+        self.assertFloatTuplesAlmostEqual(acc.mean()[:3], (2, 5, 7))
+        self.assertFloatTuplesAlmostEqual(acc.variance()[:3], (1, 0, 0))
+        self.assertFloatTuplesAlmostEqual(acc.minima[:3], (1, 5, 7))
+        self.assertFloatTuplesAlmostEqual(acc.maxima[:3], (3, 5, 7))
+        self.assertTrue(numpy.isnan(acc.mean()[3]))
+
+    def test_002_wrap_around (self):
+        acc = pattern_accumulator(90)
+        acc.add(numpy.array((-0.1, 2*numpy.pi + 0.1)),
+                numpy.array((1, 2), numpy.float32))
+        self.assertEqual(tuple(acc.count), (1, 0, 0, 1))
+
+    def test_003_sweeps (self):
+        acc = pattern_accumulator(90)
+        acc.add(numpy.array((0.1, 1.7)), numpy.array((1, 2), numpy.float32), 0)
+        # a newer sweep restarts bin 0, an older one is ignored in bin 1
+        acc.add(numpy.array((0.1, 1.7, 1.7)),
+                numpy.array((10, 11, 12), numpy.float32),
+                numpy.array((1, 0, 1)))
+        self.assertEqual(tuple(acc.count), (1, 1, 0, 0))
+        self.assertFloatTuplesAlmostEqual(acc.mean()[:2], (10, 12))
+
+    def test_004_bin_width (self):
+        acc = pattern_accumulator(0.25)
+        self.assertEqual(acc.nbins, 1440)
+        self.assertEqual(tuple(acc.bin_index((0, numpy.pi))), (0, 720))
+
+    def test_005_angle_grid (self):
+        acc = pattern_accumulator(90)
+        grid = acc.grid
+        self.assertTrue(grid is pattern_accumulator(90).grid)
+        self.assertFloatTuplesAlmostEqual(grid.angles,
+            numpy.pi/4 * numpy.array((1, 3, 5, 7)))
+        self.assertFloatTuplesAlmostEqual(grid.cos**2 + grid.sin**2, (1,)*4)
+        self.assertFloatTuplesAlmostEqual(grid.run(7, 3), grid.angles[[3, 0, 1]])
+
+    def test_006_dirty (self):
+        acc = pattern_accumulator(90)
+        self.assertEqual(list(acc.take_dirty()), [0, 1, 2, 3])
+        self.assertEqual(list(acc.take_dirty()), [])
+        acc.add_bins(numpy.array((2, 2)), numpy.array((1, numpy.nan)))
+        self.assertEqual(list(acc.take_dirty()), [2])
+        # a newer sweep restarts its bins, older samples change nothing
+        acc.add_bins(numpy.array((1,)), numpy.array((1.0,)), 1)
+        acc.add_bins(numpy.array((3,)), numpy.array((1.0,)), -1)
+        self.assertEqual(list(acc.take_dirty()), [1])
+        self.assertFloatTuplesAlmostEqual(acc.mean(numpy.array((1, 2))), (1, 1))
+
+    def test_007_sweeps_per_batch (self):
+        acc = pattern_accumulator(90)
+        archived = []
+        sweeps = sweep_tracker(acc, archived.append)
+        # one batch completing revolution 0, 1 and 2
+        bins = numpy.arange(2, 13)
+        sweeps.add(bins, bins.astype(numpy.float64))
+        self.assertEqual(len(archived), 3)
+        self.assertFloatTuplesAlmostEqual(archived[0][2:], (2, 3))
+        self.assertFloatTuplesAlmostEqual(archived[1], (4, 5, 6, 7))
+        self.assertFloatTuplesAlmostEqual(archived[2], (8, 9, 10, 11))
+        self.assertEqual(sweeps.revolution, 3)
+        self.assertFloatTuplesAlmostEqual(acc.mean()[:1], (12,))
+
+    def test_008_measurements (self):
+        # every forward measurement is revolution 0 of its own
+        acc = pattern_accumulator(90)
+        archived = []
+        sweeps = sweep_tracker(acc, archived.append)
+        sweeps.restart()
+        self.assertEqual(archived, [])
+        bins = numpy.arange(4)
+        sweeps.add(bins, numpy.ones(4))
+        sweeps.restart()
+        sweeps.add(bins, numpy.zeros(4))
+        self.assertEqual(len(archived), 1)
+        self.assertFloatTuplesAlmostEqual(archived[0], (1, 1, 1, 1))
+        self.assertFloatTuplesAlmostEqual(acc.mean(), (0, 0, 0, 0))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_pattern_store, "qa_pattern_store.xml")
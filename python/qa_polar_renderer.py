@@ -0,0 +1,107 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+from gnuradio import gr, gr_unittest
+from polar_renderer import decimate_minmax, overlay_layer, sector_trace, \
+    set_grid_data
+from angle_grid import get_angle_grid
+
+class fake_renderer(object):
+
+    def __init__(self):
+        self.static = []
+
+    def columns(self):
+        return 100
+
+    def add_static(self, angles, values, color):
+        self.static.append(values)
+        return len(self.static) - 1
+
+    def remove_static(self, index):
+        self.static[index] = None
+
+class qa_polar_renderer (gr_unittest.TestCase):
+
+    def test_001_decimate_keeps_extrema (self):
+        angles = numpy.arange(12, dtype=numpy.float64)
+        values = numpy.array((1, 5, 2, 0, 3, 3, 9, 4, 4, 2, 2, -1), numpy.float32)
+        x, y = decimate_minmax(angles, values, 3)
+        self.assertFloatTuplesAlmostEqual(x, (0, 3, 4, 7, 8, 11))
+        self.assertFloatTuplesAlmostEqual(y, (0, 5, 3, 9, -1, 4))
+
+    def test_002_decimate_gaps (self):
+        angles = numpy.arange(8, dtype=numpy.float64)
+        values = numpy.array((numpy.nan, 1, 2, numpy.nan) + (numpy.nan,)*4,
+            numpy.float32)
+        x, y = decimate_minmax(angles, values, 2)
+        self.assertFloatTuplesAlmostEqual(y[:2], (1, 2))
+        self.assertTrue(numpy.isnan(y[2:]).all())
+
+    def test_003_decimate_small (self):
+        angles = numpy.arange(6, dtype=numpy.float64)
+        values = numpy.arange(6, dtype=numpy.float32)
+        x, y = decimate_minmax(angles, values, 3)
+        self.assertTrue(x is angles and y is values)
+
+    def test_004_overlay_sweeps (self):
+        renderer = fake_renderer()
+        overlays = overlay_layer(renderer, keep=2)
+        angles = numpy.arange(4, dtype=numpy.float64)
+        overlays.add('reference', angles, numpy.zeros(4))
+        for i in range(3):
+            overlays.add_sweep(angles, numpy.ones(4) * (i+1))
+        # nothing is drawn before apply, and only once
+        self.assertEqual(renderer.static, [])
+        self.assertTrue(overlays.apply())
+        self.assertFalse(overlays.apply())
+        self.assertEqual(overlays.names(), ['reference', 'sweep 2', 'sweep 3'])
+        self.assertEqual([v[0] for v in renderer.static if v is not None],
+            [0, 2, 3])
+        overlays.set_keep(0)
+        overlays.remove('reference')
+        overlays.apply()
+        self.assertEqual(overlays.names(), [])
+        self.assertEqual(renderer.static.count(None), len(renderer.static))
+
+    def test_005_sectors (self):
+        trace = sector_trace(list, get_angle_grid(10), 3)
+        self.assertEqual(list(trace.starts), [0, 3, 6, 10])
+        # lines overlap by one bin, so they join up
+        self.assertEqual(list(trace.positions[0]), [0, 1, 2, 3])
+        self.assertEqual(list(trace.sectors(numpy.array((3,)))), [0, 1])
+        self.assertEqual(list(trace.sectors(numpy.array((0, 5, 9)))), [0, 1, 2])
+        self.assertEqual(list(trace.sectors(numpy.array((7, 8)))), [2])
+
+    def test_006_grid_data (self):
+        class line(object):
+            def set_data(self, angles, values):
+                self.angles, self.values = angles, values
+        grid = get_angle_grid(4)
+        trace = line()
+        set_grid_data(trace, grid, grid.positions(7, 3), (1, 2, 3))
+        self.assertFloatTuplesAlmostEqual(trace.angles, grid.angles[[3, 0, 1]])
+        self.assertEqual(trace.values, (1, 2, 3))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_polar_renderer, "qa_polar_renderer.xml")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import threading
+import numpy
+from gnuradio import gr, gr_unittest
+from ring_buffer import ring_buffer, spsc_ring, image_ring, ring_watcher
+
+class qa_ring_buffer (gr_unittest.TestCase):
+
+    def test_001_fill (self):
+        rb = ring_buffer(4)
+        self.assertEqual(len(rb), 0)
+        rb.write(numpy.array((1, 2), numpy.float32))
+        self.assertFloatTuplesAlmostEqual(rb.view(), (1, 2))
+
+    def test_002_wrap (self):
+        rb = ring_buffer(4)
+        for i in range(3):
+            rb.write(numpy.arange(3*i, 3*i+3, dtype=numpy.float32))
+        self.assertEqual(len(rb), 4)
+        self.assertFloatTuplesAlmostEqual(rb.view(), (5, 6, 7, 8))
+
+    def test_003_oversized_write (self):
+        rb = ring_buffer(4)
+        rb.write(numpy.array((1,), numpy.float32))
+        rb.write(numpy.arange(10, dtype=numpy.float32))
+        self.assertFloatTuplesAlmostEqual(rb.view(), (6, 7, 8, 9))
+        rb.write(numpy.array((10,), numpy.float32))
+        self.assertFloatTuplesAlmostEqual(rb.view(), (7, 8, 9, 10))
+
+    def test_004_view_is_not_a_copy (self):
+        rb = ring_buffer(4)
+        rb.write(numpy.arange(6, dtype=numpy.float32))
+        self.assertFalse(rb.view().flags.owndata)
+        self.assertFalse(rb.view().flags.writeable)
+
+    def test_005_spsc_wrap (self):
+        ring = spsc_ring(4)
+        self.assertEqual(ring.write(numpy.arange(3, dtype=numpy.float32)), 3)
+        self.assertFloatTuplesAlmostEqual(ring.read(), (0, 1, 2))
+        ring.write(numpy.arange(3, 6, dtype=numpy.float32))
+        self.assertEqual(len(ring), 3)
+        self.assertFloatTuplesAlmostEqual(ring.read(), (3, 4, 5))
+        self.assertEqual(len(ring.read()), 0)
+
+    def test_006_spsc_never_overwrites (self):
+        ring = spsc_ring(4)
+        self.assertEqual(ring.write(numpy.arange(6, dtype=numpy.float32)), 4)
+        self.assertEqual(ring.free(), 0)
+        ring.wait_space(0)
+        self.assertEqual(ring.overruns, 1)
+        self.assertEqual(ring.high_water, 4)
+        self.assertFloatTuplesAlmostEqual(ring.read(), (0, 1, 2, 3))
+        self.assertEqual(ring.free(), 4)
+
+    def test_007_image_rows (self):
+        image = image_ring(3, 4)
+        bins = numpy.arange(2, 10)
+        changed = image.write(bins, bins.astype(numpy.float32))
+        self.assertEqual(list(changed), [0, 1, 2])
+        self.assertEqual(image.head(), 2)
+        self.assertFloatTuplesAlmostEqual(image.data[1], (4, 5, 6, 7))
+        # a new revolution clears the oldest row before writing it
+        image.write(numpy.array((13,)), numpy.array((1,), numpy.float32))
+        self.assertEqual(image.head(), 0)
+        self.assertTrue(numpy.isnan(image.data[0][[0, 2, 3]]).all())
+        self.assertEqual(image.data[0][1], 1)
+        # restarted bin numbers start over
+        image.write(numpy.array((0,)), numpy.array((5,), numpy.float32))
+        self.assertEqual(image.head(), 0)
+        self.assertTrue(numpy.isnan(image.data[1:]).all())
+
+    def test_008_watcher_survives_subscribers (self):
+        received = []
+        events = [threading.Event(), threading.Event()]
+        class controller(object):
+            def __setitem__(self, key, value):
+                received.append(list(value))
+                events[len(received) - 1].set()
+                if len(received) == 1: raise ValueError("broken subscriber")
+        ring = spsc_ring(4)
+        ring_watcher(ring, controller(), 'msg', 0.01)
+        ring.write(numpy.array((1,), numpy.float32))
+        self.assertTrue(events[0].wait(2))
+        # the ring is still drained after the error
+        ring.write(numpy.array((2,), numpy.float32))
+        self.assertTrue(events[1].wait(2))
+        self.assertEqual(received, [[1], [2]])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_ring_buffer, "qa_ring_buffer.xml")
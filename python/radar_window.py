@@ -30,6 +30,16 @@ from gnuradio.wxgui.constants import *
 from gnuradio import gr #for gr.prefs
 from gnuradio.wxgui import forms
 
+from ring_buffer import ring_buffer
+import pattern_store
+from frame_scheduler import frame_scheduler, value_coalescer, \
+    DEFAULT_DRAW_BUDGET
+from polar_renderer import blit_renderer, decimate_minmax, set_grid_data, \
+    style_polar_axes, TRACE_COLOR
+from wx_polar_renderer import wx_polar_canvas, DEFAULT_RENDER_BACKEND
+from autoscale import autoscale
+from waterfall_window import waterfall_window
+
 
 import matplotlib
 matplotlib.use('WXAgg')
@@ -37,9 +47,8 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_wxagg import \
     FigureCanvasWxAgg as FigCanvas, \
     NavigationToolbar2WxAgg as NavigationToolbar
-import pylab
 
-import time
+import threading
 
 
 
@@ -110,23 +119,19 @@ class radar_window(wx.Panel, pubsub.pubsub):
         maxval,
         peak_hold,
         msg_key,
-        graphing_rate,
-        revolution_time
+        revolution_time,
+        bin_width=pattern_store.DEFAULT_BIN_WIDTH,
+        draw_budget=DEFAULT_DRAW_BUDGET,
+        render_backend=DEFAULT_RENDER_BACKEND,
+        waterfall_rows=0
     ):
         pubsub.pubsub.__init__(self)
         wx.Panel.__init__(self, parent, style=wx.SUNKEN_BORDER)
         #setup
-        self.graphing_rate = graphing_rate
         self.revolution_time = revolution_time
-        self.samples_per_revolution = graphing_rate*revolution_time
-        if self.samples_per_revolution != int(self.samples_per_revolution):
-            print("WARNING: samples_per_revolution (graphing_rate * revolution_time) should be integer")
-        self.samples_per_revolution = int(self.samples_per_revolution)
-        self.angle_per_sample = 2*numpy.pi/self.samples_per_revolution
-
-        self.draw_fps=5 # frames per second
-        self.draw_spf=1/self.draw_fps
-        self.draw_next=time.time()+self.draw_spf
+
+        self.draw_fps=5 # initial frames per second, adapted to the draw time
+        self.lock = threading.Lock()
         
 
         self.peak_val_real = NEG_INF
@@ -166,55 +171,122 @@ class radar_window(wx.Panel, pubsub.pubsub):
         )
         sizer.AddStretchSpacer()
 
-        self.data = [0]
-        self.init_plot()
-        self.canvas = FigCanvas(self, -1, self.fig)
+        self.pattern = pattern_store.pattern_accumulator(bin_width)
+        self.angles = self.pattern.grid.angles
+        self.history = ring_buffer(self.pattern.nbins)
+        self.history.write(numpy.zeros(1, numpy.float32))
+        self.bin_count = 1 # absolute number of the next bin
+        self.data = self.history.view()
+        self.scale = autoscale()
+        self.scale.add(self.data)
+        if render_backend == 'wx':
+            self.init_wx_plot()
+        else:
+            self.init_plot()
+            self.canvas = FigCanvas(self, -1, self.fig)
+            self.renderer = blit_renderer(self.canvas, self.axes,
+                (self.plot_data, self.plot_max, self.plot_min))
         sizer.Add(self.canvas)#, 1, flag=wx.LEFT | wx.TOP | wx.GROW)  
+        # pattern over time, fed from the same messages
+        self.waterfall = None
+        if waterfall_rows:
+            self.waterfall = waterfall_window(self, controller,
+                size=(size[0], DEFAULT_WIN_SIZE[1]), minval=minval,
+                maxval=maxval, msg_key=msg_key, bin_width=bin_width,
+                rows=waterfall_rows)
+            sizer.Add(self.waterfall, 0, wx.EXPAND)
 
         #hide/show gauges
         self.show_gauges(True)
         self.SetSizerAndFit(main_box)
         #register events
+        self.frames = frame_scheduler(self, self.draw_plot, self.draw_fps,
+            ps=controller, budget=draw_budget)
+        self.values = value_coalescer(self, self.show_value)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
         self.subscribe(MSG_KEY, self.handle_msg)
+        self.subscribe(PEAK_HOLD_KEY, self.frames.invalidate)
+        self.subscribe(PEAK_HOLD_KEY, self.handle_peak_hold)
+
+    def on_destroy(self, event):
+        event.Skip()
+        # the destroy events of child windows propagate here too
+        if event.GetEventObject() is not self: return
+        # the timers must not fire into a destroyed window
+        self.frames.stop()
+        self.values.stop()
+
+    def handle_peak_hold(self, peak_hold):
+        """
+        Start a fresh hold whenever keeping values is switched off.
+        """
+        if peak_hold: return
+        with self.lock:
+            self.pattern.reset()
+            # the held extrema may be gone
+            self.scale.invalidate()
+
+
+    def extrema(self):
+        """
+        Get minimum and maximum of the live trace and the held envelope.
+        Called by the autoscale, with the lock held, when its own
+        extrema are stale.
+        """
+        values = [self.history.view()]
+        if self[PEAK_HOLD_KEY]:
+            values += [self.pattern.minima, self.pattern.maxima]
+        values = numpy.concatenate(values)
+        if numpy.isnan(values).all(): return numpy.nan, numpy.nan
+        return numpy.nanmin(values), numpy.nanmax(values)
+
+    def show_value(self, sample):
+        """
+        Set the gauge and the label, called by the value coalescer.
+        """
+        format_string = "%.10f"
+        label_text = "%s %s"%(format_string%sample,"")
+        self[VALUE_REAL_KEY] = sample
 
+        #set label text
+        self[VALUE_REPR_KEY] = label_text
 
     def handle_msg(self, msg):
         try:
             """
-            Handle a message from the message queue.
-            Convert the string based message into a float or complex.
-            If more than one number was read, only take the last number.
-            Perform peak hold operations, set the gauges and display.
+            Handle a batch of bins from the ring watcher.
+            Take the completed angle bins drained from the ring, records
+            of the absolute bin number and its value. All bins of the
+            message are appended to the pattern in one step, the gauge and
+            label show the latest value at a capped rate.
+            Perform peak hold operations, the frame scheduler redraws
+            the display.
 
             Args:
-                event: event.data is the number sample as a character array
+                msg: array of angle_binner.BIN_DTYPE records
             """
             #print time.time()
             if not self[RUNNING_KEY]: return
-            format_string = "%.10f"
-
-            sample = numpy.fromstring(msg, numpy.float32)[-1]
-            label_text = "%s %s"%(format_string%sample,"")
-            self[VALUE_REAL_KEY] = sample
-
-            #set label text
-            self[VALUE_REPR_KEY] = label_text
 
+            samples = msg['value']
+            if not len(samples): return
+            self.values.add(samples)
+
+
+            bins = msg['bin']
+            with self.lock:
+                self.bin_count = bins[-1] + 1
+                if self[PEAK_HOLD_KEY]:
+                    self.pattern.add_bins(bins % self.pattern.nbins, samples)
+                # the ring buffer drops data from the previous revolution
+                dropped = len(self.history) + len(samples) \
+                        - self.history.capacity
+                if dropped > 0:
+                    self.scale.remove(self.history.view()[:dropped])
+                self.history.write(samples)
+                self.scale.add(samples)
+            self.frames.invalidate()
 
-            self.data.append(sample)
-
-            if not self[PEAK_HOLD_KEY]:
-                # delete data which is from the previous revolution
-
-                if len(self.data) > self.samples_per_revolution:
-                    self.data = self.data[-self.samples_per_revolution:]
-            
-            
-            if self.draw_next <= time.time():
-                self.draw_plot()
-                self.draw_next=time.time()+self.draw_spf
-                #print(self.draw_next)
-            
         except Exception,e:
             print e
 
@@ -225,18 +297,8 @@ class radar_window(wx.Panel, pubsub.pubsub):
         self.fig = Figure((3.0, 3.0), dpi=self.dpi)
 
         self.axes = self.fig.add_subplot(111, projection='polar')
-        self.axes.set_axis_bgcolor('#444444')
-        self.axes.set_title('Very important random data', size=12)
-
-        xmin=0
-        xmax=2*numpy.pi
-        self.axes.set_xbound(lower=xmin, upper=xmax)
-        self.axes.grid(True, color='gray')
-
-        pylab.setp(self.axes.get_xticklabels(), fontsize=8)
-        pylab.setp(self.axes.get_yticklabels(), fontsize=8)
-        pylab.setp(self.axes.get_xticklabels(), 
-            visible=True)#self.cb_xlab.IsChecked())
+        style_polar_axes(self.axes, 'Very important random data',
+            title_size=12)
 
         # plot the data as a line series, and save the reference 
         # to the plotted line series
@@ -244,11 +306,37 @@ class radar_window(wx.Panel, pubsub.pubsub):
         self.plot_data = self.axes.plot(
             self.data, 
             linewidth=1,
-            color=(1, 1, 0),
+            color=TRACE_COLOR,
             )[0]
+        # envelope of the held values, one point per angle bin
+        self.plot_max, self.plot_min = self.axes.plot(
+            self.angles, self.pattern.maxima, self.angles, self.pattern.minima,
+            linewidth=1,
+            color=(1, 0.5, 0),
+            visible=False,
+            )
 
-    def draw_plot(self):
+    def init_wx_plot(self):
+        """
+        Set up the wx_polar_canvas with the same traces as init_plot.
+        """
+        self.canvas = wx_polar_canvas(self, size=DEFAULT_WIN_SIZE,
+            title='Very important random data')
+        self.plot_data = self.canvas.plot(linewidth=1, color=(1, 1, 0))
+        self.plot_max, self.plot_min = [
+            self.canvas.plot(linewidth=1, color=(1, 0.5, 0), visible=False)
+            for i in range(2)]
+        # the canvas renders its frames itself
+        self.renderer = self.canvas
 
+    def draw_plot(self):
+        # render from a snapshot, handle_msg keeps running meanwhile
+        with self.lock:
+            self.data = numpy.array(self.history.view())
+            bin_count = self.bin_count
+            maxima = self.pattern.maxima.copy()
+            minima = self.pattern.minima.copy()
+            bounds = self.scale.limits(self.extrema)
 
         # for ymin and ymax, find the minimal and maximal values
         # in the data set and add a mininal margin.
@@ -266,14 +354,12 @@ class radar_window(wx.Panel, pubsub.pubsub):
         #    ymax = round(max(self.data), 0) + 1
         #else:
         #    ymax = int(self.ymax_control.manual_value())
-        ymin = round(min(self.data), 0)
-        ymax = round(max(self.data), 0)
-        delta = (ymax-ymin)*0.1
-        ymin -= delta
-        ymax += delta
-
-
-        self.axes.set_ybound(lower=ymin, upper=ymax)
+        hold = self[PEAK_HOLD_KEY]
+        # the autoscale follows the extrema incrementally and only
+        # moves the bounds when the data leaves its hysteresis band.
+        # only a change of the bounds redraws grid and tick labels
+        if bounds is not None:
+            self.renderer.set_ybound(*bounds)
 
         # anecdote: axes.grid assumes b=True if any other flag is
         # given even if b is set to False.
@@ -290,11 +376,22 @@ class radar_window(wx.Panel, pubsub.pubsub):
         #  
 
         
-        self.plot_data.set_xdata(numpy.arange(
-                0,
-                self.angle_per_sample*len(self.data),
-                self.angle_per_sample))
-        self.plot_data.set_ydata(numpy.array(self.data))
-
-        self.canvas.draw()
+        # bins sit at their absolute position in the revolution,
+        # so the live trace lines up with the held envelope
+        first = bin_count - len(self.data)
+        # more bins than the plot has pixels around are reduced
+        # to the envelope of every angular pixel column
+        columns = self.renderer.columns()
+        grid = self.pattern.grid
+        set_grid_data(self.plot_data, grid, *decimate_minmax(
+            grid.positions(first, len(self.data)), self.data, columns))
+
+        for line, values in ((self.plot_max, maxima),
+                             (self.plot_min, minima)):
+            line.set_visible(hold)
+            if hold:
+                set_grid_data(line, grid, *decimate_minmax(grid.bins,
+                    values, columns))
+
+        self.renderer.draw()
 
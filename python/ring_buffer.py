@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+import threading
+import traceback
+
+##################################################
+# Circular sample buffer
+##################################################
+class ring_buffer(object):
+    """
+    A fixed capacity circular buffer of samples.
+
+    Every sample is stored twice, at its position and one capacity
+    further, so the most recent samples are always one contiguous
+    slice of the storage. Reading them is a view, not a copy.
+    """
+
+    def __init__(self, capacity, dtype=numpy.float32):
+        """
+        Create a new ring buffer.
+
+        Args:
+            capacity: the maximum number of samples kept
+            dtype: the numpy type of the samples
+        """
+        self.capacity = int(capacity)
+        if self.capacity < 1:
+            raise ValueError("ring_buffer capacity must be at least 1")
+        self._buf = numpy.zeros(2*self.capacity, dtype)
+        self._head = 0 # next write position
+        self._fill = 0
+
+    def __len__(self):
+        return self._fill
+
+    def clear(self):
+        """
+        Forget all samples, the storage is kept.
+        """
+        self._head = 0
+        self._fill = 0
+
+    def write(self, samples):
+        """
+        Append samples, overwriting the oldest ones when full.
+
+        Args:
+            samples: array of new samples, oldest first
+        """
+        count = len(samples)
+        if not count: return
+        cap = self.capacity
+        # only the last capacity samples survive the write
+        samples = samples[-cap:]
+        n = len(samples)
+        start = (self._head + count - n) % cap
+        first = min(n, cap - start)
+        buf = self._buf
+        buf[start:start+first] = samples[:first]
+        buf[start+cap:start+cap+first] = samples[:first]
+        rest = n - first
+        if rest:
+            buf[:rest] = samples[first:]
+            buf[cap:cap+rest] = samples[first:]
+        self._head = (self._head + count) % cap
+        self._fill = min(self._fill + count, cap)
+
+    def view(self):
+        """
+        Get the buffered samples, oldest first.
+
+        Returns:
+            a read-only view into the buffer, valid until the next write
+        """
+        end = self._head + self.capacity
+        v = self._buf[end-self._fill:end]
+        v.flags.writeable = False
+        return v
+
+##################################################
+# Circular image buffer
+##################################################
+class image_ring(object):
+    """
+    A fixed number of rows, one per revolution, each holding one value
+    per angle bin.
+
+    Bins are written in place at their absolute number: the revolution
+    selects the row, modulo the number of rows, and the bin within the
+    revolution selects the column. Starting a revolution clears its row,
+    the oldest one. Nothing is ever moved or reallocated.
+    """
+
+    def __init__(self, rows, columns, dtype=numpy.float32):
+        """
+        Create a new image ring.
+
+        Args:
+            rows: the number of revolutions kept
+            columns: the number of bins per revolution
+            dtype: the numpy type of the values
+        """
+        self.rows = int(rows)
+        self.columns = int(columns)
+        if self.rows < 1 or self.columns < 1:
+            raise ValueError("image_ring needs at least one row and column")
+        self.data = numpy.empty((self.rows, self.columns), dtype)
+        self.clear()
+
+    def clear(self):
+        self.data.fill(numpy.nan)
+        self.newest = -1 # absolute number of the newest revolution
+
+    def write(self, bins, values):
+        """
+        Write values at absolute bin numbers, in increasing order.
+
+        Args:
+            bins: array of absolute bin numbers
+            values: array of values
+
+        Returns:
+            the indices of the rows that changed
+        """
+        if not len(bins): return numpy.zeros(0, numpy.int64)
+        revolutions = bins // self.columns
+        # the bin numbers restart with a new measurement
+        if revolutions[0] < self.newest: self.clear()
+        last = int(revolutions[-1])
+        for revolution in range(max(self.newest + 1, last - self.rows + 1),
+                                last + 1):
+            self.data[revolution % self.rows].fill(numpy.nan)
+        self.newest = max(self.newest, last)
+        kept = revolutions > self.newest - self.rows
+        rows = revolutions[kept] % self.rows
+        self.data[rows, bins[kept] % self.columns] = values[kept]
+        return numpy.unique(rows)
+
+    def head(self):
+        """
+        Get the index of the row of the newest revolution.
+        """
+        return max(self.newest, 0) % self.rows
+
+##################################################
+# Lossless single producer, single consumer queue
+##################################################
+class spsc_ring(object):
+    """
+    A bounded queue of records shared by one producer and one consumer.
+
+    The producer only advances the write count and the consumer only the
+    read count, so no lock is needed. Nothing is ever overwritten: when
+    the ring is full the producer has to wait for room, each such wait
+    is counted in overruns.
+    """
+
+    def __init__(self, capacity, dtype=numpy.float32):
+        """
+        Create a new ring.
+
+        Args:
+            capacity: the maximum number of records waiting to be read
+            dtype: the numpy type of the records
+        """
+        self.capacity = int(capacity)
+        if self.capacity < 1:
+            raise ValueError("spsc_ring capacity must be at least 1")
+        self._buf = numpy.zeros(self.capacity, dtype)
+        self._written = 0
+        self._read = 0
+        self.overruns = 0
+        self.high_water = 0
+        self._data_ready = threading.Event()
+        self._space_ready = threading.Event()
+
+    def __len__(self):
+        return self._written - self._read
+
+    def free(self):
+        """
+        Get the number of records that can be written without waiting.
+        """
+        return self.capacity - (self._written - self._read)
+
+    def write(self, records):
+        """
+        Append records, producer side.
+
+        Args:
+            records: array of records, at most free() of them
+
+        Returns:
+            the number of records written
+        """
+        n = min(len(records), self.free())
+        if not n: return 0
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start+first] = records[:first]
+        self._buf[:n-first] = records[first:n]
+        # publish the records only after they are in place
+        self._written += n
+        self.high_water = max(self.high_water, self._written - self._read)
+        self._data_ready.set()
+        return n
+
+    def wait_space(self, timeout):
+        """
+        Wait until the consumer made room, producer side.
+        Called when the ring is too full, every call counts as an overrun.
+
+        Args:
+            timeout: the maximum time to wait in seconds
+        """
+        self.overruns += 1
+        self._space_ready.clear()
+        if self.free(): return
+        self._space_ready.wait(timeout)
+
+    def read(self):
+        """
+        Take all waiting records, consumer side.
+
+        Returns:
+            a copy of the records, oldest first
+        """
+        self._data_ready.clear()
+        n = self._written - self._read
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        records = numpy.concatenate((
+            self._buf[start:start+first], self._buf[:n-first]))
+        self._read += n
+        self._space_ready.set()
+        return records
+
+    def wait(self, timeout=None):
+        """
+        Wait until records are waiting, consumer side.
+
+        Returns:
+            True if there is something to read
+        """
+        self._data_ready.wait(timeout)
+        return len(self) > 0
+
+##################################################
+# Ring watcher
+##################################################
+class ring_watcher(threading.Thread):
+    """
+    Drain an spsc_ring into a pubsub key.
+
+    Counterpart of common.input_watcher for an spsc_ring: whenever the
+    producer wrote something, everything waiting is published as one
+    record array. The subscribers run on the watcher thread, an error
+    in one is printed and the ring drained on, the producer would wait
+    for room forever otherwise.
+    """
+
+    def __init__(self, ring, controller, msg_key, poll_interval=0.5):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        self._ring = ring
+        self._controller = controller
+        self._msg_key = msg_key
+        self._poll_interval = poll_interval
+        self.start()
+
+    def run(self):
+        while True:
+            if not self._ring.wait(self._poll_interval): continue
+            try: self._controller[self._msg_key] = self._ring.read()
+            except Exception: traceback.print_exc()
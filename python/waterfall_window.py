@@ -0,0 +1,179 @@
+#
+# Copyright 2008 Free Software Foundation, Inc.
+#
+# This file is part of GNU Radio
+#
+# GNU Radio is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# GNU Radio is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GNU Radio; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+##################################################
+# Imports
+##################################################
+import copy
+import threading
+import numpy
+import wx
+from gnuradio.wxgui import pubsub
+from gnuradio.wxgui.constants import *
+
+from ring_buffer import image_ring
+import pattern_store
+from frame_scheduler import frame_scheduler
+from polar_renderer import blit_renderer, set_background
+
+import matplotlib
+matplotlib.use('WXAgg')
+from matplotlib import cm
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_wxagg import \
+    FigureCanvasWxAgg as FigCanvas
+
+##################################################
+# Constants
+##################################################
+DEFAULT_ROWS = 100
+DEFAULT_COLORMAP = 'jet'
+DEFAULT_FPS = 2
+
+##################################################
+# Waterfall window
+##################################################
+class waterfall_window(wx.Panel, pubsub.pubsub):
+    """
+    The pattern versus time: angle across, one row per revolution, the
+    newest revolution on top.
+
+    The values live in an image_ring, and a second ring of the same
+    shape holds their colors. Only rows that received bins since the
+    last frame are color mapped again, usually just the newest one. The
+    color ring is shown as two images: the rows from the newest one
+    back to the start of the ring, and the older rows behind them. A
+    new revolution only moves the split between the two, no row is
+    copied.
+
+    Both images are part of the cached plot background, which is
+    rendered again once per revolution. In between, a frame only blits
+    a one row image of the newest revolution over its strip.
+    """
+
+    def __init__(
+        self,
+        parent,
+        controller,
+        size,
+        minval,
+        maxval,
+        msg_key,
+        bin_width=pattern_store.DEFAULT_BIN_WIDTH,
+        rows=DEFAULT_ROWS,
+    ):
+        """
+        Create a new waterfall window.
+
+        Args:
+            parent: the wx parent window
+            controller: the pubsub with the messages
+            size: the (width, height) of the plot
+            minval: the value at the bottom of the color map
+            maxval: the value at the top of the color map
+            msg_key: the key of the angle_binner.BIN_DTYPE records
+            bin_width: the width of an angle bin in degrees
+            rows: the number of revolutions shown
+        """
+        pubsub.pubsub.__init__(self)
+        wx.Panel.__init__(self, parent, style=wx.SUNKEN_BORDER)
+        self.proxy(MSG_KEY, controller, msg_key)
+        self.lock = threading.Lock()
+        self.image = image_ring(rows, pattern_store.num_bins(bin_width))
+        self.rgba = numpy.zeros(self.image.data.shape + (4,), numpy.uint8)
+        self.dirty = numpy.zeros(rows, bool)
+        self.cmap = copy.copy(cm.get_cmap(DEFAULT_COLORMAP))
+        self.cmap.set_bad((0, 0, 0, 0))
+        self.norm = Normalize(minval, maxval)
+        self.init_plot(size)
+        self.canvas = FigCanvas(self, -1, self.fig)
+        self.renderer = blit_renderer(self.canvas, self.axes,
+            (self.current,))
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.canvas, 1, wx.EXPAND)
+        self.SetSizerAndFit(sizer)
+        self.frames = frame_scheduler(self, self.draw_plot, DEFAULT_FPS)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+        self.subscribe(MSG_KEY, self.handle_msg)
+
+    def on_destroy(self, event):
+        event.Skip()
+        # the destroy events of child windows propagate here too
+        if event.GetEventObject() is not self: return
+        # the timer must not fire into a destroyed window
+        self.frames.stop()
+
+    def handle_msg(self, msg):
+        """
+        Write a batch of bins from the ring watcher into their rows.
+
+        Args:
+            msg: array of angle_binner.BIN_DTYPE records
+        """
+        with self.lock:
+            self.dirty[self.image.write(msg['bin'], msg['value'])] = True
+        self.frames.invalidate()
+
+    def init_plot(self, size):
+        self.dpi = 100
+        self.fig = Figure((size[0] / float(self.dpi), size[1] / float(self.dpi)),
+            dpi=self.dpi)
+        self.axes = self.fig.add_subplot(111)
+        set_background(self.axes, '#444444')
+        self.axes.set_title('Pattern over time', size=10)
+        self.axes.set_xlabel('angle (deg)', size=8)
+        self.axes.set_ylabel('revolutions ago', size=8)
+        self.axes.tick_params(labelsize=8)
+        rows = self.image.rows
+        self.newer, self.older, self.current = [self.axes.imshow(
+            self.rgba[:1], aspect='auto', interpolation='nearest',
+            origin='lower', extent=(0, 360, 0.5, -0.5),
+            ) for i in range(3)]
+        self.head = None # the newest row in the background
+        self.axes.set_xlim(0, 360)
+        self.axes.set_ylim(rows - 0.5, -0.5)
+
+    def draw_plot(self):
+        with self.lock:
+            changed = numpy.flatnonzero(self.dirty)
+            self.dirty[:] = False
+            values = self.image.data[changed]
+            head = self.image.head()
+        # color map only the rows that changed
+        self.rgba[changed] = self.cmap(
+            self.norm(numpy.ma.masked_invalid(values)), bytes=True)
+        if head != self.head or (changed != head).any():
+            # a new revolution moves every row, render the background
+            # once with it. row 0 of an image sits at the bottom of its
+            # extent, the newest revolution at zero revolutions ago
+            rows = self.image.rows
+            self.newer.set_data(self.rgba[:head+1])
+            self.newer.set_extent((0, 360, head + 0.5, -0.5))
+            self.older.set_visible(head + 1 < rows)
+            if head + 1 < rows:
+                self.older.set_data(self.rgba[head+1:])
+                self.older.set_extent((0, 360, rows - 0.5, head + 0.5))
+            self.head = head
+            self.renderer.invalidate()
+        self.current.set_data(self.rgba[head:head+1])
+        extent = self.renderer.extent(self.current)
+        self.renderer.draw(None if extent is None else [extent])
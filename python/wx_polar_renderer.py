@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 <+YOU OR YOUR COMPANY+>.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy
+import wx
+
+from polar_renderer import angular_columns, BACKGROUND_COLOR, GRID_COLOR, \
+    REGION_PAD
+
+##################################################
+# Constants
+##################################################
+RENDER_BACKENDS = ('matplotlib', 'wx')
+DEFAULT_RENDER_BACKEND = 'matplotlib'
+NUM_RINGS = 4
+NUM_SPOKES = 8
+
+def _colour(color):
+    """
+    Convert a matplotlib style (r, g, b) tuple in [0, 1] to a wx.Colour.
+    """
+    if isinstance(color, basestring): return wx.Colour(color)
+    return wx.Colour(*[int(round(255*c)) for c in color])
+
+##################################################
+# Polar trace
+##################################################
+class polar_trace(object):
+    """
+    A polyline in polar coordinates, drawn by a wx_polar_canvas.
+
+    Supports the part of the matplotlib Line2D interface the windows
+    use. Points set at positions of an angle_grid take their cosine and
+    sine from the tables of the grid, nothing is computed. Only angles
+    set with set_xdata are computed, once per new angle array.
+    """
+
+    def __init__(self, color, linewidth, visible):
+        self.pen = wx.Pen(_colour(color), linewidth)
+        self._visible = visible
+        self._angles = None
+        self._grid = self._positions = None
+        self._cos = self._sin = None
+        self._radii = numpy.zeros(0)
+        self._version = 0
+        self._segments = (None, [])
+
+    def set_visible(self, visible):
+        self._visible = visible
+
+    def get_visible(self):
+        return self._visible
+
+    def set_xdata(self, angles):
+        if angles is self._angles: return
+        self._angles = angles
+        self._grid = self._positions = None
+        self._cos = numpy.cos(angles)
+        self._sin = numpy.sin(angles)
+        self._version += 1
+
+    def set_ydata(self, radii):
+        self._radii = radii
+        self._version += 1
+
+    def set_data(self, angles, radii):
+        self.set_xdata(angles)
+        self.set_ydata(radii)
+
+    def set_grid_data(self, grid, positions, radii):
+        """
+        Set the points at positions of an angle_grid.
+
+        Args:
+            grid: the angle_grid
+            positions: indices into the tables of the grid ending in 2
+            radii: one value per position
+        """
+        if grid is not self._grid or positions is not self._positions:
+            self._grid, self._positions = grid, positions
+            self._angles = None
+            self._cos = grid.cos2[positions]
+            self._sin = grid.sin2[positions]
+        self.set_ydata(radii)
+
+    def segments(self, cx, cy, scale, lower):
+        """
+        Get the trace in pixel coordinates, split at NaN values.
+
+        Returns:
+            list of (n, 2) arrays of points
+        """
+        key = (self._version, cx, cy, scale, lower)
+        if self._segments[0] != key:
+            self._segments = (key, self._compute(cx, cy, scale, lower))
+        return self._segments[1]
+
+    def _compute(self, cx, cy, scale, lower):
+        if self._cos is None or not len(self._radii): return []
+        r = numpy.maximum(self._radii - lower, 0) * scale
+        x = cx + r * self._cos
+        y = cy - r * self._sin
+        valid = ~numpy.isnan(r)
+        if valid.all(): return [numpy.column_stack((x, y))]
+        # runs of valid points, separated by NaN
+        edges = numpy.flatnonzero(numpy.diff(
+            numpy.concatenate(([0], valid.view(numpy.int8), [0]))))
+        return [numpy.column_stack((x[a:b], y[a:b]))
+                for a, b in zip(edges[::2], edges[1::2]) if b - a > 1]
+
+##################################################
+# Overlay text
+##################################################
+class polar_text(object):
+    """
+    A text in the lower left corner, matplotlib Text style interface.
+    """
+
+    def __init__(self, color, fontsize, visible):
+        self.colour = _colour(color)
+        self.font = wx.Font(fontsize, wx.FONTFAMILY_TELETYPE,
+            wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
+        self._visible = visible
+        self._text = ''
+
+    def set_visible(self, visible):
+        self._visible = visible
+
+    def get_visible(self):
+        return self._visible
+
+    def set_text(self, text):
+        self._text = text
+
+    def get_text(self):
+        return self._text
+
+##################################################
+# Polar canvas
+##################################################
+class wx_polar_canvas(wx.Panel):
+    """
+    A polar plot drawn directly with wx.GraphicsContext.
+
+    A fast alternative to matplotlib for live monitoring, with the same
+    renderer interface as blit_renderer (set_ybound, draw) and traces
+    that behave like matplotlib lines. The grid, tick labels, title and
+    static traces are drawn once into a bitmap, which is rebuilt only
+    when the size or the radial bounds change, or a static trace comes
+    or goes. A frame blits that bitmap and strokes the visible traces.
+    """
+
+    def __init__(self, parent, size, title=''):
+        """
+        Create a new polar canvas.
+
+        Args:
+            parent: the wx parent window
+            size: the (width, height) of the canvas
+            title: the plot title
+        """
+        wx.Panel.__init__(self, parent, size=size)
+        self.SetBackgroundStyle(wx.BG_STYLE_CUSTOM)
+        self.title = title
+        self.traces = []
+        self.static_traces = []
+        self.texts = []
+        self._lower, self._upper = 0.0, 1.0
+        self._background = None
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_SIZE, self._on_size)
+
+    def plot(self, color=(1, 1, 0), linewidth=1, visible=True):
+        """
+        Add a trace, drawn in the order of creation.
+        """
+        trace = polar_trace(color, linewidth, visible)
+        self.traces.append(trace)
+        return trace
+
+    def text(self, color=GRID_COLOR, fontsize=6, visible=True):
+        """
+        Add an overlay text.
+        """
+        text = polar_text(color, fontsize, visible)
+        self.texts.append(text)
+        return text
+
+    def set_ybound(self, lower, upper):
+        if (lower, upper) == (self._lower, self._upper): return
+        self._lower, self._upper = float(lower), float(upper)
+        self._background = None
+
+    def add_static(self, angles, values, color):
+        """
+        Add a trace that is part of the cached background.
+
+        Returns:
+            a handle for remove_static
+        """
+        trace = polar_trace(color, 1, True)
+        trace.set_data(angles, values)
+        self.static_traces.append(trace)
+        self._background = None
+        return trace
+
+    def remove_static(self, trace):
+        self.static_traces.remove(trace)
+        self._background = None
+
+    def needs_full(self):
+        """
+        Tell if the next frame is a full draw, all traces must be
+        up to date then.
+        """
+        return self._background is None
+
+    def extent(self, artist):
+        """
+        Get the region a trace covers, in window coordinates.
+
+        Returns:
+            (x0, y0, x1, y1), or None if unknown or empty
+        """
+        if not isinstance(artist, polar_trace): return None
+        width, height, cx, cy, radius = self._geometry()
+        scale = radius / max(self._upper - self._lower, 1e-12)
+        segments = artist.segments(cx, cy, scale, self._lower)
+        if not segments: return None
+        points = numpy.concatenate(segments)
+        (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+        pad = artist.pen.GetWidth()
+        return x0 - pad, y0 - pad, x1 + pad, y1 + pad
+
+    def columns(self):
+        """
+        Get the number of angular pixel columns of the plot.
+        """
+        return angular_columns(self._geometry()[4])
+
+    def draw(self, regions=None):
+        """
+        Render one frame.
+
+        Args:
+            regions: optional list of extents that changed, only these
+                are repainted
+        """
+        if regions is None or self._background is None:
+            self.Refresh(False)
+        else:
+            for x0, y0, x1, y1 in regions:
+                self.RefreshRect(wx.Rect(int(x0) - REGION_PAD,
+                    int(y0) - REGION_PAD, int(x1 - x0) + 2*REGION_PAD + 1,
+                    int(y1 - y0) + 2*REGION_PAD + 1), False)
+        # paint now, so the frame scheduler measures the real cost
+        self.Update()
+
+    def _geometry(self):
+        width, height = self.GetClientSize()
+        # room for the title above and the angle labels around
+        cx, cy = width / 2.0, height / 2.0 + 6
+        radius = max(min(width, height - 12) / 2.0 - 18, 1)
+        return width, height, cx, cy, radius
+
+    def _on_size(self, event):
+        self._background = None
+        self.Refresh(False)
+        event.Skip()
+
+    def _render_background(self):
+        width, height, cx, cy, radius = self._geometry()
+        bitmap = wx.EmptyBitmap(max(width, 1), max(height, 1))
+        dc = wx.MemoryDC(bitmap)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        gc = wx.GraphicsContext.Create(dc)
+        gc.SetPen(wx.Pen(_colour(GRID_COLOR), 1))
+        gc.SetBrush(wx.Brush(_colour(BACKGROUND_COLOR)))
+        gc.DrawEllipse(cx - radius, cy - radius, 2*radius, 2*radius)
+        gc.SetBrush(wx.TRANSPARENT_BRUSH)
+        font = wx.Font(8, wx.FONTFAMILY_SWISS,
+            wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
+        gc.SetFont(font, wx.BLACK)
+        # rings with their radial value
+        for i in range(1, NUM_RINGS + 1):
+            r = radius * i / float(NUM_RINGS)
+            gc.DrawEllipse(cx - r, cy - r, 2*r, 2*r)
+            value = self._lower + (self._upper - self._lower) * i / float(NUM_RINGS)
+            gc.DrawText("%g" % round(value, 2), cx + 2, cy - r)
+        # spokes with their angle
+        for i in range(NUM_SPOKES):
+            a = 2*numpy.pi * i / NUM_SPOKES
+            c, s = numpy.cos(a), numpy.sin(a)
+            gc.StrokeLine(cx, cy, cx + radius*c, cy - radius*s)
+            label = u"%d°" % (360 * i / NUM_SPOKES)
+            w, h = gc.GetTextExtent(label)
+            gc.DrawText(label, cx + (radius + 10)*c - w/2.0,
+                cy - (radius + 10)*s - h/2.0)
+        w, h = gc.GetTextExtent(self.title)
+        gc.DrawText(self.title, (width - w) / 2.0, 0)
+        self._stroke(gc, self.static_traces, cx, cy, radius)
+        dc.SelectObject(wx.NullBitmap)
+        self._background = bitmap
+
+    def _stroke(self, gc, traces, cx, cy, radius, box=None):
+        scale = radius / max(self._upper - self._lower, 1e-12)
+        gc.Clip(cx - radius, cy - radius, 2*radius, 2*radius)
+        for trace in traces:
+            if not trace.get_visible(): continue
+            if box is not None:
+                # skip traces outside the repainted region
+                extent = self.extent(trace)
+                if extent is None or not box.Intersects(wx.Rect(
+                        int(extent[0]), int(extent[1]),
+                        int(extent[2] - extent[0]) + 1,
+                        int(extent[3] - extent[1]) + 1)):
+                    continue
+            gc.SetPen(trace.pen)
+            for points in trace.segments(cx, cy, scale, self._lower):
+                gc.StrokeLines(points.tolist())
+        gc.ResetClip()
+
+    def _on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        if self._background is None: self._render_background()
+        dc.DrawBitmap(self._background, 0, 0)
+        width, height, cx, cy, radius = self._geometry()
+        gc = wx.GraphicsContext.Create(dc)
+        self._stroke(gc, self.traces, cx, cy, radius,
+            self.GetUpdateRegion().GetBox())
+        for text in self.texts:
+            if not text.get_visible() or not text.get_text(): continue
+            gc.SetFont(text.font, text.colour)
+            lines = text.get_text().split("\n")
+            line_height = gc.GetTextExtent("M")[1]
+            for i, line in enumerate(lines):
+                gc.DrawText(line, 2, height - (len(lines) - i)*line_height - 2)
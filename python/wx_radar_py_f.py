@@ -23,6 +23,11 @@ import numpy
 from gnuradio import gr
 
 import radar_window
+import pattern_store
+import frame_scheduler
+import wx_polar_renderer
+from angle_binner import angle_binner, make_ring
+from ring_buffer import ring_watcher
 from gnuradio.wxgui import common
 from gnuradio import gr, filter
 from gnuradio import analog
@@ -43,6 +48,11 @@ class wx_radar_py_f(gr.hier_block2, common.wxgui_hb):
 		graphing_rate=1,
 		size=radar_window.DEFAULT_WIN_SIZE,
 		peak_hold=False,
+		bin_width=pattern_store.DEFAULT_BIN_WIDTH,
+		average='mean',
+		draw_budget=frame_scheduler.DEFAULT_DRAW_BUDGET,
+		render_backend=wx_polar_renderer.DEFAULT_RENDER_BACKEND,
+		waterfall_rows=0,
 		**kwargs #catchall for backwards compatibility
 		):
         	#init
@@ -54,23 +64,26 @@ class wx_radar_py_f(gr.hier_block2, common.wxgui_hb):
 			gr.io_signature(0, 0, 0),
 		)
 		#blocks
-		sd = blocks.stream_to_vector_decimator(
-			item_size=gr.sizeof_float,
+		#graphing_rate is kept for compatibility, every sample is
+		#averaged into its angle bin and only completed bins are posted
+		nbins = pattern_store.num_bins(bin_width)
+		ring = make_ring(nbins)
+		binner = angle_binner(
+			ring=ring,
+			nbins=nbins,
 			sample_rate=sample_rate,
-			vec_rate=graphing_rate,
-			vec_len=1,
+			revolution_time=revolution_time,
+			average=average,
 		)
 
 		#mult = blocks.multiply_const_ff(factor)
 		#add = blocks.add_const_ff(ref_level)
 		#avg = filter.single_pole_iir_filter_ff(1.0)
 
-		msgq = gr.msg_queue(2)
-		sink = blocks.message_sink(self._item_size, msgq, True)
 		#controller
 		self.controller = pubsub()
-		self.controller.subscribe(SAMPLE_RATE_KEY, sd.set_sample_rate)
-		self.controller.publish(SAMPLE_RATE_KEY, sd.sample_rate)
+		self.controller.subscribe(SAMPLE_RATE_KEY, binner.set_sample_rate)
+		self.controller.publish(SAMPLE_RATE_KEY, binner.sample_rate)
 		#self.controller[AVERAGE_KEY] = False
 		#self.controller[AVG_ALPHA_KEY] = None
 		#def update_avg(*args):
@@ -81,7 +94,7 @@ class wx_radar_py_f(gr.hier_block2, common.wxgui_hb):
 		#self.controller.subscribe(AVG_ALPHA_KEY, update_avg)
 
 		#start input watcher
-		common.input_watcher(msgq, self.controller, MSG_KEY)
+		ring_watcher(ring, self.controller, MSG_KEY)
 		#create window
 		self.win = radar_window.radar_window(
 			parent=parent,
@@ -91,8 +104,11 @@ class wx_radar_py_f(gr.hier_block2, common.wxgui_hb):
 			maxval=maxval,
 			peak_hold=peak_hold,
 			msg_key=MSG_KEY,
-			graphing_rate=graphing_rate,
-			revolution_time=revolution_time
+			revolution_time=revolution_time,
+			bin_width=bin_width,
+			draw_budget=draw_budget,
+			render_backend=render_backend,
+			waterfall_rows=waterfall_rows,
 		)
 		common.register_access_methods(self, self.controller)
 		#backwards compadibility
@@ -100,7 +116,7 @@ class wx_radar_py_f(gr.hier_block2, common.wxgui_hb):
 		#connect
 
 		#self.wxgui_connect(self, sd, mult, add, avg, sink)
-		self.wxgui_connect(self, sd, sink)
+		self.wxgui_connect(self, binner)
 
 
 